@@ -0,0 +1,44 @@
+"""
+    Compares two result files of run_benchmarks, for example of two commits:
+
+        python -m benchmark.compare_results before.json after.json
+"""
+
+from typing import Dict, Any, Iterator, Tuple
+import argparse
+import json
+
+
+def flatten(result: Dict[str, Any], prefix: str = '') -> Iterator[Tuple[str, float]]:
+    """
+        Provides the numeric measurements with their path, for example
+        queries/10000/top_10/p50_milliseconds.
+    """
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key}/')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f'{prefix}{key}', float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares two benchmark result files.')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+
+    results = []
+    for file_name in [args.before, args.after]:
+        with open(file_name, mode='r', encoding='utf-8') as f:
+            data = json.load(f)
+        results.append(dict(flatten({key: data[key] for key in ['indexing', 'queries', 'clustering']})))
+    before, after = results
+    for name, value in before.items():
+        if name not in after:
+            continue
+        change = (after[name] / value - 1) * 100 if value != 0 else float('nan')
+        print(f'{name:60} {value:14.3f} {after[name]:14.3f} {change:+8.1f}%')
+
+
+if __name__ == '__main__':
+    main()
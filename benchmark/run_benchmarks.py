@@ -0,0 +1,174 @@
+"""
+    Measures indexing throughput, query latency, peak memory and clustering time on
+    synthetic corpora and writes the results as JSON. Run from the repository root:
+
+        python -m benchmark.run_benchmarks --output results.json
+"""
+
+from typing import List, Dict, Any, Callable
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from benchmark.synthetic_corpus import SyntheticCorpus, create_corpus, create_queries, \
+    create_synthetic_embedding_store
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.word_set_builder import WordSetBuilder
+from src.word_set_manager import WordSetManager
+from src.word_tokenizer import WordTokenizer
+
+
+def create_word_set_manager(corpus: SyntheticCorpus) -> WordSetManager:
+    word_set_manager = WordSetManager()
+    for number, word_set in enumerate(corpus.word_sets):
+        word_set_manager.add(f'set_{number}', word_set)
+    return word_set_manager
+
+
+def create_text_index(corpus: SyntheticCorpus, tokenizer: WordTokenizer, use_add_many: bool) -> TextIndex:
+    text_index = TextIndex(create_word_set_manager(corpus), tokenizer)
+    if use_add_many:
+        text_index.add_many(corpus.texts)
+    else:
+        for text in corpus.texts:
+            text_index.add(text)
+    return text_index
+
+
+def measure_seconds(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def measure_peak_memory(function: Callable[[], Any]) -> int:
+    """
+        Provides the peak of the memory allocated by Python while the function runs.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_indexing(corpus: SyntheticCorpus, tokenizer: WordTokenizer) -> Dict[str, Any]:
+    result = {}
+    for method, use_add_many in [('add', False), ('add_many', True)]:
+        seconds = measure_seconds(lambda: create_text_index(corpus, tokenizer, use_add_many))
+        result[f'{method}_texts_per_second'] = len(corpus.texts) / seconds
+    # measured separately, because tracing the allocations slows down the indexing
+    result['peak_memory_bytes'] = measure_peak_memory(lambda: create_text_index(corpus, tokenizer, True))
+    return result
+
+
+def benchmark_queries(text_index: TextIndex, queries: List[List[str]], top_k_values: List[int | None]) \
+        -> Dict[str, Any]:
+    """
+        Measures the latency of every query. The caches are disabled, so the
+        latencies show the cost of the scoring.
+    """
+    text_search = TextSearch(text_index, element_cache_size=0, statistics_cache_size=0)
+    result = {}
+    for k in top_k_values:
+        latencies = np.array([measure_seconds(lambda: text_search.find_texts(keywords, k)) for keywords in queries])
+        result['all' if k is None else f'top_{k}'] = {
+            'p50_milliseconds': float(np.percentile(latencies, 50) * 1000),
+            'p99_milliseconds': float(np.percentile(latencies, 99) * 1000),
+            'queries_per_second': len(queries) / float(latencies.sum())
+        }
+    return result
+
+
+def benchmark_clustering(vocabulary_size: int, clustering_algorithm: str, word_set_coverage: float,
+                         seed: int) -> Dict[str, Any]:
+    corpus = create_corpus(0, vocabulary_size, word_set_coverage=word_set_coverage, seed=seed)
+    with tempfile.TemporaryDirectory() as directory:
+        embedding_store = create_synthetic_embedding_store(directory, corpus, seed=seed)
+        word_set_builder = WordSetBuilder(clustering_algorithm=clustering_algorithm, embedding_store=embedding_store)
+        start = time.perf_counter()
+        word_sets = word_set_builder.create_sets_from_word_list(corpus.vocabulary)
+        seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'number_of_word_sets': len(word_sets),
+            'number_of_generated_word_sets': len(corpus.word_sets)}
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(corpus_sizes: List[int], top_k_values: List[int | None], vocabulary_sizes: List[int],
+                   number_of_queries: int = 200, word_set_coverage: float = 0.2, zipf_exponent: float = 1.0,
+                   clustering_algorithm: str = 'auto', seed: int = 0) -> Dict[str, Any]:
+    """
+        Runs all benchmarks. The corpora, queries and embeddings depend only on the
+        parameters, so results of different commits can be compared.
+    :return: Parameters, environment and measurements
+    """
+    tokenizer = WordTokenizer(use_vectors=False)
+    # load the tokenizer before the first measurement
+    tokenizer.tokenize('warm up')
+    result = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'corpus_sizes': corpus_sizes, 'top_k_values': top_k_values,
+                       'vocabulary_sizes': vocabulary_sizes, 'number_of_queries': number_of_queries,
+                       'word_set_coverage': word_set_coverage, 'zipf_exponent': zipf_exponent,
+                       'clustering_algorithm': clustering_algorithm, 'seed': seed},
+        'indexing': {},
+        'queries': {},
+        'clustering': {}
+    }
+    for corpus_size in corpus_sizes:
+        corpus = create_corpus(corpus_size, word_set_coverage=word_set_coverage, zipf_exponent=zipf_exponent,
+                               seed=seed)
+        queries = create_queries(corpus, number_of_queries, zipf_exponent=zipf_exponent, seed=seed + 1)
+        result['indexing'][str(corpus_size)] = benchmark_indexing(corpus, tokenizer)
+        text_index = create_text_index(corpus, tokenizer, use_add_many=True)
+        result['queries'][str(corpus_size)] = benchmark_queries(text_index, queries, top_k_values)
+    for vocabulary_size in vocabulary_sizes:
+        result['clustering'][str(vocabulary_size)] = benchmark_clustering(vocabulary_size, clustering_algorithm,
+                                                                          word_set_coverage, seed)
+    return result
+
+
+def parse_top_k(value: str) -> int | None:
+    return None if value == 'all' else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks indexing, search and word set building.')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file for the results')
+    parser.add_argument('--corpus-sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--top-k', type=parse_top_k, nargs='+', default=[None, 10, 100],
+                        help='values of k, "all" ranks all texts')
+    parser.add_argument('--vocabulary-sizes', type=int, nargs='+', default=[500, 1000, 2000])
+    parser.add_argument('--queries', type=int, default=200, help='number of queries per corpus size')
+    parser.add_argument('--word-set-coverage', type=float, default=0.2)
+    parser.add_argument('--zipf-exponent', type=float, default=1.0)
+    parser.add_argument('--clustering-algorithm', default='auto')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = run_benchmarks(args.corpus_sizes, args.top_k, args.vocabulary_sizes, args.queries,
+                            args.word_set_coverage, args.zipf_exponent, args.clustering_algorithm, args.seed)
+    with open(args.output, mode='w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Generates reproducible synthetic corpora, word sets and embeddings for the benchmarks."""
+
+from typing import List, Set
+from dataclasses import dataclass
+import json
+import os
+import numpy as np
+
+from src.embedding_store import EmbeddingStore, VECTORS_FILE_NAME, WORDS_FILE_NAME
+
+CONSONANTS = 'bdfgklmnprstvz'
+VOWELS = 'aeiou'
+
+
+@dataclass
+class SyntheticCorpus:
+    """
+        Container for a generated corpus. The words of the vocabulary are sorted by
+        frequency rank, the most frequent word first.
+    """
+    vocabulary: List[str]
+    texts: List[str]
+    word_sets: List[Set[str]]
+
+
+def create_vocabulary(size: int) -> List[str]:
+    """
+        Creates distinct words made of syllables, so the tokenizer keeps every word
+        as one token.
+    :param size: Number of words
+    :return: The words, the same for the same size
+    """
+    syllables = [consonant + vowel for consonant in CONSONANTS for vowel in VOWELS]
+    result = []
+    for number in range(size):
+        word = ''
+        while True:
+            number, remainder = divmod(number, len(syllables))
+            word += syllables[remainder]
+            if number == 0:
+                break
+        # two syllables at least, so the words do not look like stop words
+        result.append(word if len(word) > 2 else word + 'n')
+    return result
+
+
+def create_zipf_probabilities(size: int, exponent: float = 1.0) -> np.ndarray:
+    """
+        Provides the probability of every rank for a Zipfian distribution, the
+        probability of rank r is proportional to 1 / r^exponent.
+    """
+    weights = 1.0 / np.arange(1, size + 1, dtype=np.float64) ** exponent
+    return weights / weights.sum()
+
+
+def create_corpus(number_of_texts: int, vocabulary_size: int = 5000, word_set_coverage: float = 0.2,
+                  word_set_size: int = 5, min_text_length: int = 5, max_text_length: int = 30,
+                  zipf_exponent: float = 1.0, seed: int = 0) -> SyntheticCorpus:
+    """
+        Creates texts whose words follow a Zipfian distribution and word sets
+        containing a part of the vocabulary.
+    :param number_of_texts: Number of texts
+    :param vocabulary_size: Number of distinct words
+    :param word_set_coverage: Share of the vocabulary that is part of a word set
+    :param word_set_size: Number of words per word set
+    :param min_text_length: Minimum number of words per text
+    :param max_text_length: Maximum number of words per text
+    :param zipf_exponent: Exponent of the Zipfian distribution, larger values make frequent words more frequent
+    :param seed: Seed of the random number generator, the same seed creates the same corpus
+    :return: Vocabulary, texts and word sets
+    """
+    if not 0 <= word_set_coverage <= 1:
+        raise ValueError('word set coverage must be between 0 and 1')
+    if word_set_size < 2 or min_text_length < 1 or max_text_length < min_text_length:
+        raise ValueError('word sets need at least 2 words and texts at least 1 word')
+    rng = np.random.default_rng(seed)
+    vocabulary = create_vocabulary(vocabulary_size)
+    probabilities = create_zipf_probabilities(vocabulary_size, zipf_exponent)
+    lengths = rng.integers(min_text_length, max_text_length + 1, size=number_of_texts)
+    ranks = rng.choice(vocabulary_size, size=int(lengths.sum()), p=probabilities)
+    texts = []
+    position = 0
+    for length in lengths:
+        texts.append(' '.join(vocabulary[rank] for rank in ranks[position:position + length]))
+        position += length
+
+    number_of_words_in_sets = int(vocabulary_size * word_set_coverage) // word_set_size * word_set_size
+    words_in_sets = rng.permutation(vocabulary_size)[:number_of_words_in_sets]
+    word_sets = [{vocabulary[rank] for rank in words_in_sets[start:start + word_set_size]}
+                 for start in range(0, number_of_words_in_sets, word_set_size)]
+    return SyntheticCorpus(vocabulary, texts, word_sets)
+
+
+def create_queries(corpus: SyntheticCorpus, number_of_queries: int, max_number_of_keywords: int = 4,
+                   zipf_exponent: float = 1.0, seed: int = 1) -> List[List[str]]:
+    """
+        Creates queries whose keywords follow the same distribution as the words of
+        the texts.
+    """
+    rng = np.random.default_rng(seed)
+    probabilities = create_zipf_probabilities(len(corpus.vocabulary), zipf_exponent)
+    return [[corpus.vocabulary[rank] for rank in rng.choice(len(corpus.vocabulary), size=size, p=probabilities)]
+            for size in rng.integers(1, max_number_of_keywords + 1, size=number_of_queries)]
+
+
+def create_synthetic_embedding_store(directory: str, corpus: SyntheticCorpus, dimension: int = 300,
+                                     noise: float = 0.3, seed: int = 2) -> EmbeddingStore:
+    """
+        Writes an embedding store for the vocabulary of the corpus. The vectors of the
+        words of a word set are scattered around a common center, the other words get
+        random vectors, so the clustering has sets to find.
+    :param directory: Directory for the store files, it is created if necessary
+    :param corpus: Corpus providing the vocabulary and the word sets
+    :param dimension: Length of the vectors
+    :param noise: Standard deviation of the distance of a word from the center of its set
+    :param seed: Seed of the random number generator
+    :return: The created store
+    """
+    rng = np.random.default_rng(seed)
+    word_to_row_map = {word: row for row, word in enumerate(corpus.vocabulary)}
+    vectors = rng.standard_normal((len(corpus.vocabulary), dimension)).astype(np.float32)
+    for word_set in corpus.word_sets:
+        center = rng.standard_normal(dimension)
+        for word in sorted(word_set):
+            vectors[word_to_row_map[word]] = center + noise * rng.standard_normal(dimension)
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, VECTORS_FILE_NAME), vectors)
+    with open(os.path.join(directory, WORDS_FILE_NAME), mode='w', encoding='utf-8') as f:
+        json.dump(corpus.vocabulary, f)
+    return EmbeddingStore(directory)
@@ -0,0 +1,169 @@
+"""Provides the text search for asyncio applications without blocking the event loop."""
+
+from typing import List, Dict, Tuple, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+import asyncio
+
+from src.mapped_text_index import load_text_index
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+
+QueryKey = Tuple[Tuple[str, ...], int | None]
+
+
+class AsyncTextSearch:
+    """
+        Runs the queries of a TextSearch in an executor. Concurrent queries with the
+        same keywords and k are computed only once. Queries arriving within the batch
+        delay are collected and scored with one call of find_texts_batch. At most
+        max_pending_queries distinct queries are pending; more queries wait until
+        a slot is free.
+    """
+    def __init__(self, text_search: TextSearch | None, executor: Executor | None = None, max_batch_size: int = 32,
+                 batch_delay: float = 0.001, max_pending_queries: int = 256, timeout: float | None = None):
+        """
+        :param text_search: Search to run, None if the executor is a process pool created by
+        create_process_executor, whose processes load the search themselves
+        :param executor: Executor running the searches, None for the default executor of the event loop
+        :param max_batch_size: Maximum number of queries scored together
+        :param batch_delay: Seconds to wait for more queries before a batch is scored
+        :param max_pending_queries: Maximum number of distinct queries that are pending at the same time
+        :param timeout: Default number of seconds after which a query fails, None to wait without limit
+        """
+        if text_search is None and executor is None:
+            raise ValueError('text search or executor must be defined')
+        if max_batch_size < 1 or max_pending_queries < 1 or batch_delay < 0:
+            raise ValueError('batch size and pending queries must be at least 1 and the batch delay not negative')
+        self.find_texts_batch: Callable[[List[List[str]], int | None], List[List[str]]] = \
+            _find_texts_batch if text_search is None else text_search.find_texts_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.batch_delay = batch_delay
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_pending_queries)
+        self.key_to_future_map: Dict[QueryKey, asyncio.Future] = {}
+        # queries of the same k are batched, because find_texts_batch uses one k for all queries
+        self.k_to_batch_map: Dict[int | None, List[QueryKey]] = {}
+        self.k_to_flush_handle_map: Dict[int | None, asyncio.TimerHandle] = {}
+        self.number_of_queries = 0
+        self.number_of_coalesced_queries = 0
+        self.number_of_batches = 0
+
+    async def find_texts(self, keywords: List[str], k: int | None = None, timeout: float | None = None) \
+            -> List[str]:
+        """
+            Same as TextSearch.find_texts, but the event loop is not blocked.
+        :param keywords: List of words representing the user input
+        :param k: If given, only the k best matching texts with a score above 0 are returned
+        :param timeout: Seconds after which asyncio.TimeoutError is raised, None for the default timeout.
+        The computation is continued for other queries waiting for the same result.
+        :return: Provides the list of matching texts with the best matching text at the
+        beginning of the list
+        """
+        if k is not None and k < 1:
+            raise ValueError('k must be at least 1')
+        self.number_of_queries += 1
+        result = await asyncio.wait_for(self.__find_texts((tuple(keywords), k)), self.timeout if timeout is None
+                                        else timeout)
+        return list(result)
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {'number_of_queries': self.number_of_queries,
+                'number_of_coalesced_queries': self.number_of_coalesced_queries,
+                'number_of_batches': self.number_of_batches,
+                'number_of_pending_queries': len(self.key_to_future_map)}
+
+    async def close(self):
+        """
+            Scores the collected queries, waits for all pending queries and shuts the
+            executor down.
+        """
+        for k in list(self.k_to_batch_map.keys()):
+            self.__flush(k)
+        futures = list(self.key_to_future_map.values())
+        if len(futures) > 0:
+            await asyncio.wait(futures)
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    async def __find_texts(self, key: QueryKey) -> List[str]:
+        future = self.key_to_future_map.get(key)
+        if future is None:
+            await self.semaphore.acquire()
+            # the same query may have been started while waiting for the semaphore
+            future = self.key_to_future_map.get(key)
+            if future is None:
+                future = self.__start_query(key)
+            else:
+                self.semaphore.release()
+                self.number_of_coalesced_queries += 1
+        else:
+            self.number_of_coalesced_queries += 1
+        # shielded, so a timeout of one caller does not cancel the query for the others
+        return await asyncio.shield(future)
+
+    def __start_query(self, key: QueryKey) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.key_to_future_map[key] = future
+        future.add_done_callback(lambda _: self.__finish_query(key))
+        k = key[1]
+        batch = self.k_to_batch_map.setdefault(k, [])
+        batch.append(key)
+        if len(batch) >= self.max_batch_size:
+            self.__flush(k)
+        elif len(batch) == 1:
+            self.k_to_flush_handle_map[k] = loop.call_later(self.batch_delay, self.__flush, k)
+        return future
+
+    def __finish_query(self, key: QueryKey):
+        del self.key_to_future_map[key]
+        self.semaphore.release()
+
+    def __flush(self, k: int | None):
+        batch = self.k_to_batch_map.pop(k, None)
+        flush_handle = self.k_to_flush_handle_map.pop(k, None)
+        if flush_handle is not None:
+            flush_handle.cancel()
+        if batch is None:
+            return
+        self.number_of_batches += 1
+        keywords_list = [list(keywords) for keywords, _ in batch]
+        batch_future = asyncio.get_running_loop().run_in_executor(self.executor, self.find_texts_batch,
+                                                                   keywords_list, k)
+        batch_future.add_done_callback(lambda _: self.__set_results(batch, batch_future))
+
+    def __set_results(self, batch: List[QueryKey], batch_future: asyncio.Future):
+        for position, key in enumerate(batch):
+            future = self.key_to_future_map[key]
+            if batch_future.cancelled():
+                future.cancel()
+            elif batch_future.exception() is not None:
+                future.set_exception(batch_future.exception())
+            else:
+                future.set_result(batch_future.result()[position])
+
+
+def create_process_executor(directory: str, number_of_processes: int) -> ProcessPoolExecutor:
+    """
+        Creates a process pool whose processes load the index saved with
+        save_text_index, to use it with AsyncTextSearch without a text search.
+        The processes memory-map the same files.
+    :param directory: Directory of the saved index
+    :param number_of_processes: Number of processes
+    :return: The process pool
+    """
+    return ProcessPoolExecutor(max_workers=number_of_processes, initializer=_initialize_worker,
+                               initargs=(directory,))
+
+
+_worker_text_search: TextSearch | None = None
+
+
+def _initialize_worker(directory: str):
+    global _worker_text_search
+    _worker_text_search = TextSearch(load_text_index(directory, WordTokenizer.get_shared(use_vectors=False)))
+
+
+def _find_texts_batch(keywords_list: List[List[str]], k: int | None) -> List[List[str]]:
+    return _worker_text_search.find_texts_batch(keywords_list, k)
@@ -0,0 +1,18 @@
+"""Splits streams of items into lists of a fixed size."""
+
+from typing import List, Iterable, Iterator
+import itertools
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+        Provides the items of the iterable in lists of the given size, only the
+        last list may be shorter. The items are read only when a list is needed,
+        so the iterable can be a stream.
+    :param iterable: Items to split
+    :param size: Number of items per list
+    :return: Generator of the lists
+    """
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
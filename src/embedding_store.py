@@ -0,0 +1,90 @@
+"""Stores word embeddings in a memory-mapped matrix, so they can be used without the language model."""
+
+from typing import List, Dict, Iterable, Tuple
+import json
+import os
+import numpy as np
+
+from src.word_tokenizer import WordTokenizer
+
+VECTORS_FILE_NAME = 'vectors.npy'
+WORDS_FILE_NAME = 'words.json'
+
+
+class EmbeddingStore:
+    """
+        Read-only map from word to embedding vector. The vectors are the rows of
+        a float32 matrix that is memory-mapped from disk, the words are kept in a
+        dictionary from word to row.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, WORDS_FILE_NAME), mode='r', encoding='utf-8') as f:
+            words = json.load(f)
+        self.word_to_row_map: Dict[str, int] = {word: row for row, word in enumerate(words)}
+        self.vectors: np.ndarray = np.load(os.path.join(directory, VECTORS_FILE_NAME), mmap_mode='r')
+
+    def get_vector(self, word: str) -> np.ndarray | None:
+        row = self.word_to_row_map.get(word)
+        if row is None:
+            return None
+        return self.vectors[row]
+
+    def get_vectors(self, words: Iterable[str]) -> Tuple[List[str], np.ndarray]:
+        """
+            Looks up the vectors of several words at once.
+        :param words: Words to look up, duplicates are removed
+        :return: Words that have a vector and the matrix with one row per found word
+        """
+        found_words = [word for word in dict.fromkeys(words) if word in self.word_to_row_map]
+        rows = [self.word_to_row_map[word] for word in found_words]
+        return found_words, np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def get_words(self) -> List[str]:
+        return list(self.word_to_row_map.keys())
+
+    def get_dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word_to_row_map
+
+    def __len__(self) -> int:
+        return len(self.word_to_row_map)
+
+
+def create_embedding_store(directory: str, tokenizer: WordTokenizer,
+                           words: Iterable[str] | None = None) -> EmbeddingStore:
+    """
+        Copies the vectors of the tokenizer's language model into a new embedding
+        store. The vectors are read in one step from the vector table of the model,
+        no texts are tokenized.
+    :param directory: Directory for the store files, it is created if necessary
+    :param tokenizer: Tokenizer whose language model provides the vectors
+    :param words: Words to store, if not given all words of the model with a vector are stored
+    :return: The created store
+    """
+    if not tokenizer.use_vectors:
+        raise ValueError('tokenizer must be created with vectors')
+    vocab = tokenizer.nlp.vocab
+    if words is None:
+        key_to_row_map = {key: row for key, row in vocab.vectors.key2row.items() if key in vocab.strings}
+        words = [vocab.strings[key] for key in key_to_row_map.keys()]
+        rows = list(key_to_row_map.values())
+    else:
+        words = [word for word in dict.fromkeys(words)]
+        rows = vocab.vectors.find(keys=words).tolist() if len(words) > 0 else []
+        words = [word for word, row in zip(words, rows) if row >= 0]
+        rows = [row for row in rows if row >= 0]
+
+    vectors = np.asarray(vocab.vectors.data, dtype=np.float32)
+    if len(rows) == 0:
+        vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+    else:
+        vectors = vectors[rows]
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, VECTORS_FILE_NAME), vectors)
+    with open(os.path.join(directory, WORDS_FILE_NAME), mode='w', encoding='utf-8') as f:
+        json.dump(words, f)
+    return EmbeddingStore(directory)
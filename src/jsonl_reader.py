@@ -0,0 +1,38 @@
+"""Reads texts from JSONL files (one JSON object per line) as a stream."""
+
+from typing import Iterable, Iterator
+import json
+
+STS_FIELDS = ('sentence1', 'sentence2')
+
+
+def read_jsonl_texts(file_name: str, fields: Iterable[str] = STS_FIELDS,
+                     number_of_lines: int | None = None) -> Iterator[str]:
+    """
+        Provides the texts of the given fields line by line, so the file never has
+        to fit into memory. Empty lines and fields that are missing or do not contain
+        a string are skipped, lines that are not a JSON object are an error.
+    :param file_name: Name of the JSONL file, for example a file of the STS benchmark
+    :param fields: Names of the fields containing the texts
+    :param number_of_lines: Maximum number of lines to read, None to read the whole file
+    :return: Generator of the texts in file order
+    :raises ValueError: If a line is not a JSON object, the message contains the line number
+    """
+    fields = list(fields)
+    with open(file_name, mode='r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            if number_of_lines is not None and line_number >= number_of_lines:
+                return
+            line = line.strip()
+            if len(line) == 0:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'line {line_number + 1} of {file_name} is not valid JSON: {error}') from error
+            if not isinstance(data, dict):
+                raise ValueError(f'line {line_number + 1} of {file_name} is not a JSON object')
+            for field in fields:
+                text = data.get(field)
+                if isinstance(text, str):
+                    yield text
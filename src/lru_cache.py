@@ -0,0 +1,60 @@
+"""Provides a bounded cache that evicts the least recently used entries."""
+
+from typing import Hashable, Any
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """
+        Map with a maximum number of entries. If the cache is full, the entry
+        that was not used for the longest time is removed. Hits and misses are
+        counted to see how effective the cache is.
+    """
+    def __init__(self, max_size: int):
+        if max_size < 0:
+            raise ValueError('max size must not be negative')
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size == 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, version: Hashable):
+        """
+            Removes all entries if the data they were computed from changed.
+        :param version: Version of the data the next entries are computed from
+        """
+        with self.lock:
+            if self.version != version:
+                self.entries.clear()
+                self.version = version
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,305 @@
+"""Stores a text index in a binary format on disk and loads it memory-mapped."""
+
+from typing import List, Dict, Iterable, Iterator, Tuple
+from collections.abc import Mapping, Sequence
+import bisect
+import json
+import os
+import numpy as np
+
+from src.postings import PostingsStatistics
+from src.text_index import TextIndex, Element, PartialTextIndex, DeletedTexts
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+META_FILE_NAME = 'meta.json'
+WORD_SETS_FILE_NAME = 'word_sets.json'
+
+
+class MappedPostings(Mapping):
+    """
+        Read-only map from text index to element frequency on top of two
+        sorted memory-mapped arrays.
+    """
+    def __init__(self, text_indices: np.ndarray, frequencies: np.ndarray):
+        self.text_indices = text_indices
+        self.frequencies = frequencies
+
+    def __getitem__(self, text_index: int) -> int:
+        position = self.__find(text_index)
+        if position < 0:
+            raise KeyError(text_index)
+        return int(self.frequencies[position])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.text_indices.tolist())
+
+    def __len__(self) -> int:
+        return len(self.text_indices)
+
+    def __contains__(self, text_index) -> bool:
+        return self.__find(text_index) >= 0
+
+    def get(self, text_index: int, default=None):
+        position = self.__find(text_index)
+        if position < 0:
+            return default
+        return int(self.frequencies[position])
+
+    def get_size_in_bytes(self) -> int:
+        return self.text_indices.nbytes + self.frequencies.nbytes
+
+    def get_frequencies(self, text_indices: Iterable[int]) -> List[int]:
+        wanted = np.fromiter(text_indices, dtype=np.int64)
+        if len(self.text_indices) == 0:
+            return [0] * len(wanted)
+        found = np.minimum(np.searchsorted(self.text_indices, wanted), len(self.text_indices) - 1)
+        return np.where(self.text_indices[found] == wanted, self.frequencies[found], 0).tolist()
+
+    def get_range(self, start: int, end: int) -> 'MappedPostings':
+        """
+            Provides the postings of the texts with start <= text index < end without
+            copying the arrays.
+        """
+        start_position, end_position = np.searchsorted(self.text_indices, [start, end])
+        return MappedPostings(self.text_indices[start_position:end_position],
+                              self.frequencies[start_position:end_position])
+
+    def keys(self) -> Iterable[int]:
+        return self.text_indices.tolist()
+
+    def values(self) -> Iterable[int]:
+        return self.frequencies.tolist()
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        return zip(self.text_indices.tolist(), self.frequencies.tolist())
+
+    def __find(self, text_index: int) -> int:
+        position = int(np.searchsorted(self.text_indices, text_index))
+        if position < len(self.text_indices) and self.text_indices[position] == text_index:
+            return position
+        return -1
+
+
+class MappedTextStore(Sequence):
+    """
+        Read-only list of texts stored as one UTF-8 byte array with an offset
+        table, so a text is only decoded when it is accessed.
+    """
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('text index out of range')
+        return self.data[self.offsets[idx]:self.offsets[idx + 1]].tobytes().decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class MappedTermDictionary(Sequence):
+    """
+        Sorted list of the term keys stored like the texts. Elements are looked
+        up with a binary search, so no dictionary has to be built when loading.
+    """
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.terms = MappedTextStore(data, offsets)
+
+    def __getitem__(self, idx: int) -> str:
+        return self.terms[idx]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def find(self, element: Element) -> int:
+        key = create_term_key(element)
+        position = bisect.bisect_left(self, key)
+        if position < len(self) and self[position] == key:
+            return position
+        return -1
+
+    def get_element(self, idx: int) -> Element:
+        return create_element_for_term_key(self[idx])
+
+
+class MappedTextIndex(TextIndex):
+    """
+        Read-only text index whose arrays are memory-mapped from the files written
+        by save_text_index. Loading takes only a few milliseconds and processes
+        loading the same directory share the page cache.
+    """
+    def __init__(self, directory: str, word_set_manager: WordSetManager, tokenizer: WordTokenizer):
+        super().__init__(word_set_manager, tokenizer)
+        with open(os.path.join(directory, META_FILE_NAME), mode='r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['format_version'] not in SUPPORTED_FORMAT_VERSIONS:
+            raise ValueError(f'unsupported index format version {meta["format_version"]}')
+        self.directory = directory
+        self.average_text_length = meta['average_text_length']
+        self.total_text_length = meta['total_text_length']
+        self.minimum_text_length = meta['minimum_text_length']
+        self.term_dictionary = MappedTermDictionary(self.__load('terms'), self.__load('term_offsets'))
+        self.postings_offsets = self.__load('postings_offsets')
+        self.postings_text_indices = self.__load('postings_text_indices')
+        self.postings_frequencies = self.__load('postings_frequencies')
+        self.max_frequencies = self.__load('max_frequencies')
+        self.word_lengths = self.__load('word_lengths')
+        self.texts = MappedTextStore(self.__load('texts'), self.__load('text_offsets'))
+        if meta['format_version'] >= 2:
+            self.deleted_text_indices = set(self.__load('deleted_text_indices').tolist())
+
+    def add(self, text: str):
+        raise ValueError('mapped text index is read only')
+
+    def add_many(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1):
+        raise ValueError('mapped text index is read only')
+
+    def merge(self, partial_text_index: PartialTextIndex):
+        raise ValueError('mapped text index is read only')
+
+    def delete(self, text_index: int):
+        raise ValueError('mapped text index is read only')
+
+    def update(self, text_index: int, text: str) -> int:
+        raise ValueError('mapped text index is read only')
+
+    def compact(self):
+        raise ValueError('mapped text index is read only')
+
+    def get_elements(self) -> Iterable[Element]:
+        return (self.term_dictionary.get_element(idx) for idx in range(len(self.term_dictionary)))
+
+    def get_postings(self, element: Element, deleted_texts: DeletedTexts | None = None) -> MappedPostings:
+        # saved postings contain no deleted texts, so the deleted texts are ignored
+        term = self.term_dictionary.find(element)
+        if term < 0:
+            return MappedPostings(self.postings_text_indices[0:0], self.postings_frequencies[0:0])
+        start = self.postings_offsets[term]
+        end = self.postings_offsets[term + 1]
+        return MappedPostings(self.postings_text_indices[start:end], self.postings_frequencies[start:end])
+
+    def get_postings_statistics(self) -> PostingsStatistics:
+        number_of_postings = len(self.postings_text_indices)
+        size_in_bytes = self.postings_offsets.nbytes + self.postings_text_indices.nbytes + \
+            self.postings_frequencies.nbytes
+        return PostingsStatistics(number_of_terms=len(self.term_dictionary), number_of_postings=number_of_postings,
+                                  size_in_bytes=size_in_bytes,
+                                  bytes_per_posting=size_in_bytes / number_of_postings if number_of_postings > 0 else 0)
+
+    def get_texts_for_element(self, element: Element) -> List[str]:
+        return [self.texts[idx] for idx in self.get_postings(element).keys()]
+
+    def get_element_frequency(self, element: Element, text_index: int) -> int:
+        return self.get_postings(element).get(text_index, 0)
+
+    def get_max_element_frequency(self, element: Element) -> int:
+        term = self.term_dictionary.find(element)
+        if term < 0:
+            return 0
+        return int(self.max_frequencies[term])
+
+    def get_word_length(self, text_index: int) -> int:
+        if 0 <= text_index < len(self.word_lengths):
+            return int(self.word_lengths[text_index])
+        return 0
+
+    def __load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+
+
+def save_text_index(text_index: TextIndex, directory: str):
+    """
+        Writes the text index and its word sets into the given directory. The terms
+        are sorted, so they can be found with a binary search after loading. Deleted
+        texts keep their text index, but are saved without text and postings.
+    :param text_index: Text index to save
+    :param directory: Directory for the index files, it is created if necessary
+    """
+    os.makedirs(directory, exist_ok=True)
+    term_key_to_element_map: Dict[str, Element] = {create_term_key(element): element
+                                                   for element in text_index.get_elements()}
+    term_keys = sorted(term_key_to_element_map.keys())
+
+    postings_offsets = [0]
+    postings_text_indices = []
+    postings_frequencies = []
+    max_frequencies = []
+    for term_key in term_keys:
+        element = term_key_to_element_map[term_key]
+        postings = sorted(text_index.get_postings(element).items())
+        postings_text_indices.extend(idx for idx, _ in postings)
+        postings_frequencies.extend(frequency for _, frequency in postings)
+        postings_offsets.append(len(postings_text_indices))
+        max_frequencies.append(text_index.get_max_element_frequency(element))
+
+    number_of_texts = text_index.get_number_of_texts()
+    _save_strings(directory, 'terms', 'term_offsets', term_keys)
+    _save_strings(directory, 'texts', 'text_offsets',
+                  (text_index.texts[idx] if text_index.contains(idx) else '' for idx in range(number_of_texts)))
+    deleted_text_indices = [idx for idx in range(number_of_texts) if not text_index.contains(idx)]
+    _save_array(directory, 'deleted_text_indices', deleted_text_indices, np.uint32)
+    _save_array(directory, 'postings_offsets', postings_offsets, np.int64)
+    _save_array(directory, 'postings_text_indices', postings_text_indices, np.uint32)
+    _save_array(directory, 'postings_frequencies', postings_frequencies, np.uint32)
+    _save_array(directory, 'max_frequencies', max_frequencies, np.uint32)
+    # deleted texts keep their length in the index until it is compacted, they are saved with length 0
+    _save_array(directory, 'word_lengths', [text_index.get_word_length(idx) if text_index.contains(idx) else 0
+                                            for idx in range(number_of_texts)], np.uint32)
+    text_index.word_set_manager.save(os.path.join(directory, WORD_SETS_FILE_NAME))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'number_of_texts': number_of_texts,
+        'number_of_deleted_texts': len(deleted_text_indices),
+        'number_of_terms': len(term_keys),
+        'average_text_length': text_index.get_average_text_length(),
+        'total_text_length': text_index.total_text_length,
+        'minimum_text_length': text_index.get_minimum_text_length()
+    }
+    with open(os.path.join(directory, META_FILE_NAME), mode='w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def load_text_index(directory: str, tokenizer: WordTokenizer,
+                    word_set_manager: WordSetManager | None = None) -> MappedTextIndex:
+    """
+        Loads a text index written by save_text_index.
+    :param directory: Directory of the index files
+    :param tokenizer: Tokenizer used to create the elements of queries
+    :param word_set_manager: Word sets to use, if not given the saved word sets are loaded
+    :return: Read-only text index on top of the memory-mapped files
+    """
+    if word_set_manager is None:
+        word_set_manager = WordSetManager.load(os.path.join(directory, WORD_SETS_FILE_NAME))
+    return MappedTextIndex(directory, word_set_manager, tokenizer)
+
+
+def create_term_key(element: Element) -> str:
+    return ('1' if element.is_category else '0') + element.value
+
+
+def create_element_for_term_key(term_key: str) -> Element:
+    value = term_key[1:]
+    if term_key[0] == '1':
+        return Element(value=value, category_label=value[2:-2], is_category=True)
+    return Element(value=value, category_label=None, is_category=False)
+
+
+def _save_strings(directory: str, name: str, offsets_name: str, strings: Iterable[str]):
+    offsets = [0]
+    data = bytearray()
+    for string in strings:
+        data.extend(string.encode('utf-8'))
+        offsets.append(len(data))
+    _save_array(directory, name, np.frombuffer(bytes(data), dtype=np.uint8), np.uint8)
+    _save_array(directory, offsets_name, offsets, np.int64)
+
+
+def _save_array(directory: str, name: str, values, dtype):
+    np.save(os.path.join(directory, name + '.npy'), np.asarray(values, dtype=dtype))
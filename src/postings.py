@@ -0,0 +1,377 @@
+"""Provides the postings of an element, the texts containing it together with the frequencies."""
+
+from typing import List, Dict, Iterable, Iterator, Tuple, AbstractSet
+from array import array
+from collections.abc import Mapping
+import bisect
+from dataclasses import dataclass
+import numpy as np
+
+BLOCK_SIZE = 128
+
+
+@dataclass
+class PostingsStatistics:
+    """
+        Container for the memory used by the postings of an index. The size counts
+        the bytes of the stored integers and skip entries, not the Python object
+        overhead.
+    """
+    number_of_terms: int
+    number_of_postings: int
+    size_in_bytes: int
+    bytes_per_posting: float
+
+
+class Postings(Mapping):
+    """
+        Map from text index to element frequency stored in two parallel integer
+        arrays. The text indices are sorted, because texts are only appended with
+        increasing text index.
+    """
+    def __init__(self):
+        self.text_indices = array('I')
+        self.frequencies = array('I')
+        self.max_frequency = 0
+
+    def append(self, text_index: int, frequency: int):
+        if len(self.text_indices) > 0 and text_index <= self.text_indices[-1]:
+            raise ValueError('text indices must be appended in increasing order')
+        self.text_indices.append(text_index)
+        self.frequencies.append(frequency)
+        if frequency > self.max_frequency:
+            self.max_frequency = frequency
+
+    def extend(self, text_indices: Iterable[int], frequencies: Iterable[int]):
+        """
+            Appends several sorted text indices, all behind the last text index.
+        """
+        text_indices = array('I', text_indices)
+        frequencies = array('I', frequencies)
+        if len(text_indices) != len(frequencies):
+            raise ValueError('text indices and frequencies must have the same length')
+        if len(text_indices) == 0:
+            return
+        if len(self.text_indices) > 0 and text_indices[0] <= self.text_indices[-1]:
+            raise ValueError('text indices must be appended in increasing order')
+        self.text_indices.extend(text_indices)
+        self.frequencies.extend(frequencies)
+        self.max_frequency = max(self.max_frequency, max(frequencies))
+
+    def get_size_in_bytes(self) -> int:
+        return _get_array_size(self.text_indices) + _get_array_size(self.frequencies)
+
+    def get_frequencies(self, text_indices: Iterable[int]) -> List[int]:
+        return [self.get(text_index, 0) for text_index in text_indices]
+
+    def get_range(self, start: int, end: int) -> 'Postings':
+        """
+            Provides the postings of the texts with start <= text index < end.
+        """
+        start_position = bisect.bisect_left(self.text_indices, start)
+        end_position = bisect.bisect_left(self.text_indices, end)
+        result = Postings()
+        result.extend(self.text_indices[start_position:end_position], self.frequencies[start_position:end_position])
+        return result
+
+    def __getitem__(self, text_index: int) -> int:
+        position = self.__find(text_index)
+        if position < 0:
+            raise KeyError(text_index)
+        return self.frequencies[position]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.text_indices)
+
+    def __len__(self) -> int:
+        return len(self.text_indices)
+
+    def __contains__(self, text_index) -> bool:
+        return self.__find(text_index) >= 0
+
+    def get(self, text_index: int, default=None):
+        position = self.__find(text_index)
+        if position < 0:
+            return default
+        return self.frequencies[position]
+
+    def keys(self) -> Iterable[int]:
+        return self.text_indices
+
+    def values(self) -> Iterable[int]:
+        return self.frequencies
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        return zip(self.text_indices, self.frequencies)
+
+    def __find(self, text_index: int) -> int:
+        position = bisect.bisect_left(self.text_indices, text_index)
+        if position < len(self.text_indices) and self.text_indices[position] == text_index:
+            return position
+        return -1
+
+
+class CompressedPostings(Mapping):
+    """
+        Postings whose text indices are delta coded and stored together with the
+        frequencies as variable-byte integers in blocks of a fixed size. For each
+        block a skip entry (last text index and byte offset) is kept, so only the
+        blocks that are needed are decoded, and they are decoded with vectorized
+        numpy operations. Only the maximum frequency of all postings is kept, not
+        one per block. The most recent postings are kept uncompressed until a block
+        is full.
+    """
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError('block size must be at least 1')
+        self.block_size = block_size
+        self.data = bytearray()
+        self.block_last_text_indices = array('I')
+        self.block_offsets = array('Q')
+        self.tail_text_indices = array('I')
+        self.tail_frequencies = array('I')
+        self.max_frequency = 0
+
+    def append(self, text_index: int, frequency: int):
+        last_text_index = self.__get_last_text_index()
+        if last_text_index is not None and text_index <= last_text_index:
+            raise ValueError('text indices must be appended in increasing order')
+        self.tail_text_indices.append(text_index)
+        self.tail_frequencies.append(frequency)
+        if frequency > self.max_frequency:
+            self.max_frequency = frequency
+        if len(self.tail_text_indices) == self.block_size:
+            self.__compress_tail()
+
+    def extend(self, text_indices: Iterable[int], frequencies: Iterable[int]):
+        for text_index, frequency in zip(text_indices, frequencies):
+            self.append(text_index, frequency)
+
+    def get_size_in_bytes(self) -> int:
+        return len(self.data) + \
+            _get_array_size(self.block_last_text_indices) + _get_array_size(self.block_offsets) + \
+            _get_array_size(self.tail_text_indices) + _get_array_size(self.tail_frequencies)
+
+    def get_frequencies(self, text_indices: Iterable[int]) -> List[int]:
+        """
+            Looks up the frequencies of several texts. Each block containing one of the
+            texts is decoded only once, the other blocks are skipped.
+        :param text_indices: Text indices to look up
+        :return: Frequency for every given text index, 0 if the text is not contained
+        """
+        text_indices = list(text_indices)
+        result = [0] * len(text_indices)
+        block_to_positions_map: Dict[int, List[int]] = {}
+        for position, text_index in enumerate(text_indices):
+            block = self.__find_block(text_index)
+            if block < 0:
+                result[position] = self.__get_tail_frequency(text_index)
+            elif block < len(self.block_last_text_indices):
+                if block in block_to_positions_map:
+                    block_to_positions_map[block].append(position)
+                else:
+                    block_to_positions_map[block] = [position]
+        for block, positions in block_to_positions_map.items():
+            block_text_indices, block_frequencies = self.__decode_block(block)
+            wanted = np.array([text_indices[position] for position in positions], dtype=np.int64)
+            found = np.minimum(np.searchsorted(block_text_indices, wanted), len(block_text_indices) - 1)
+            matches = block_text_indices[found] == wanted
+            for position, is_match, frequency in zip(positions, matches.tolist(), block_frequencies[found].tolist()):
+                if is_match:
+                    result[position] = frequency
+        return result
+
+    def get_range(self, start: int, end: int) -> Postings:
+        """
+            Provides the postings of the texts with start <= text index < end. Only the
+            blocks overlapping the range are decoded.
+        """
+        result = Postings()
+        for block in range(bisect.bisect_left(self.block_last_text_indices, start), len(self.block_last_text_indices)):
+            block_text_indices, block_frequencies = self.__decode_block(block)
+            selected = (block_text_indices >= start) & (block_text_indices < end)
+            result.extend(block_text_indices[selected].tolist(), block_frequencies[selected].tolist())
+            if block_text_indices[-1] >= end:
+                return result
+        start_position = bisect.bisect_left(self.tail_text_indices, start)
+        end_position = bisect.bisect_left(self.tail_text_indices, end)
+        result.extend(self.tail_text_indices[start_position:end_position],
+                      self.tail_frequencies[start_position:end_position])
+        return result
+
+    def __getitem__(self, text_index: int) -> int:
+        frequency = self.get(text_index, 0)
+        if frequency == 0:
+            raise KeyError(text_index)
+        return frequency
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.block_last_text_indices) * self.block_size + len(self.tail_text_indices)
+
+    def __contains__(self, text_index) -> bool:
+        return self.get(text_index, 0) > 0
+
+    def get(self, text_index: int, default=None):
+        frequency = self.get_frequencies([text_index])[0]
+        if frequency == 0:
+            return default
+        return frequency
+
+    def keys(self) -> Iterable[int]:
+        for block in range(len(self.block_last_text_indices)):
+            yield from self.__decode_block(block)[0].tolist()
+        yield from self.tail_text_indices
+
+    def values(self) -> Iterable[int]:
+        for block in range(len(self.block_last_text_indices)):
+            yield from self.__decode_block(block)[1].tolist()
+        yield from self.tail_frequencies
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        for block in range(len(self.block_last_text_indices)):
+            block_text_indices, block_frequencies = self.__decode_block(block)
+            yield from zip(block_text_indices.tolist(), block_frequencies.tolist())
+        yield from zip(self.tail_text_indices, self.tail_frequencies)
+
+    def __get_last_text_index(self) -> int | None:
+        if len(self.tail_text_indices) > 0:
+            return self.tail_text_indices[-1]
+        if len(self.block_last_text_indices) > 0:
+            return self.block_last_text_indices[-1]
+        return None
+
+    def __find_block(self, text_index: int) -> int:
+        """
+            Uses the skip entries to find the block that may contain the text index.
+        :return: Number of the block, the number of blocks if the text index is not
+        contained or -1 if the text index belongs to the uncompressed tail
+        """
+        if len(self.tail_text_indices) > 0 and text_index >= self.tail_text_indices[0]:
+            return -1
+        return bisect.bisect_left(self.block_last_text_indices, text_index)
+
+    def __get_tail_frequency(self, text_index: int) -> int:
+        position = bisect.bisect_left(self.tail_text_indices, text_index)
+        if position < len(self.tail_text_indices) and self.tail_text_indices[position] == text_index:
+            return self.tail_frequencies[position]
+        return 0
+
+    def __compress_tail(self):
+        previous_text_index = self.block_last_text_indices[-1] if len(self.block_last_text_indices) > 0 else 0
+        deltas = [self.tail_text_indices[0] - previous_text_index]
+        deltas.extend(self.tail_text_indices[idx] - self.tail_text_indices[idx - 1]
+                      for idx in range(1, len(self.tail_text_indices)))
+        self.block_offsets.append(len(self.data))
+        self.block_last_text_indices.append(self.tail_text_indices[-1])
+        _encode_variable_bytes(deltas, self.data)
+        _encode_variable_bytes(self.tail_frequencies, self.data)
+        self.tail_text_indices = array('I')
+        self.tail_frequencies = array('I')
+
+    def __decode_block(self, block: int) -> Tuple[np.ndarray, np.ndarray]:
+        start = self.block_offsets[block]
+        end = self.block_offsets[block + 1] if block + 1 < len(self.block_offsets) else len(self.data)
+        values = _decode_variable_bytes(np.frombuffer(self.data, dtype=np.uint8, count=end - start, offset=start))
+        previous_text_index = self.block_last_text_indices[block - 1] if block > 0 else 0
+        text_indices = np.cumsum(values[:self.block_size]) + previous_text_index
+        return text_indices, values[self.block_size:]
+
+
+class LivePostings(Mapping):
+    """
+        Read-only view of postings without the deleted texts. The deleted texts are
+        skipped while the postings are read, so the postings are not copied.
+    """
+    def __init__(self, postings: Mapping[int, int], deleted_text_indices: AbstractSet[int],
+                 number_of_deleted_texts: int | None = None):
+        """
+        :param postings: Postings including the deleted texts
+        :param deleted_text_indices: Text indices of the deleted texts
+        :param number_of_deleted_texts: Number of deleted texts contained in the postings,
+        None to count them
+        """
+        self.postings = postings
+        self.deleted_text_indices = deleted_text_indices
+        if number_of_deleted_texts is None:
+            number_of_deleted_texts = sum(1 for text_index in deleted_text_indices if text_index in postings)
+        self.length = len(postings) - number_of_deleted_texts
+        # an upper bound, the maximum may belong to a deleted text
+        self.max_frequency = postings.max_frequency
+
+    def __getitem__(self, text_index: int) -> int:
+        if text_index in self.deleted_text_indices:
+            raise KeyError(text_index)
+        return self.postings[text_index]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __contains__(self, text_index) -> bool:
+        return text_index not in self.deleted_text_indices and text_index in self.postings
+
+    def get(self, text_index: int, default=None):
+        if text_index in self.deleted_text_indices:
+            return default
+        return self.postings.get(text_index, default)
+
+    def get_size_in_bytes(self) -> int:
+        return self.postings.get_size_in_bytes()
+
+    def get_frequencies(self, text_indices: Iterable[int]) -> List[int]:
+        text_indices = list(text_indices)
+        return [0 if text_index in self.deleted_text_indices else frequency
+                for text_index, frequency in zip(text_indices, self.postings.get_frequencies(text_indices))]
+
+    def get_range(self, start: int, end: int) -> Postings:
+        """
+            Provides the postings of the texts with start <= text index < end.
+        """
+        items = [(text_index, frequency) for text_index, frequency in self.postings.get_range(start, end).items()
+                 if text_index not in self.deleted_text_indices]
+        result = Postings()
+        result.extend((text_index for text_index, _ in items), (frequency for _, frequency in items))
+        return result
+
+    def keys(self) -> Iterable[int]:
+        return (text_index for text_index in self.postings.keys() if text_index not in self.deleted_text_indices)
+
+    def values(self) -> Iterable[int]:
+        return (frequency for _, frequency in self.items())
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        return ((text_index, frequency) for text_index, frequency in self.postings.items()
+                if text_index not in self.deleted_text_indices)
+
+
+def _encode_variable_bytes(values: Iterable[int], data: bytearray):
+    for value in values:
+        while value >= 0x80:
+            data.append((value & 0x7f) | 0x80)
+            value >>= 7
+        data.append(value)
+
+
+def _decode_variable_bytes(data: np.ndarray) -> np.ndarray:
+    """
+        Decodes variable-byte integers without a loop over the values: the last byte
+        of every integer has the high bit cleared, so the integers are found by the
+        positions of these bytes and the 7 bit groups are shifted and summed up.
+    """
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    groups = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = ((np.arange(len(data)) - starts[groups]) * 7).astype(np.int64)
+    values = (data & 0x7f).astype(np.int64) << shifts
+    return np.add.reduceat(values, starts)
+
+
+def _get_array_size(values: array) -> int:
+    return len(values) * values.itemsize
@@ -0,0 +1,113 @@
+"""Collects timings and counters of queries to find out why a query is slow."""
+
+from typing import List, Dict, Callable, Any
+from dataclasses import dataclass, field
+import logging
+import threading
+import time
+
+STAGE_EXPANSION = 'expansion'
+STAGE_POSTINGS = 'postings'
+STAGE_SCORING = 'scoring'
+STAGE_RANKING = 'ranking'
+STAGE_MATERIALIZATION = 'materialization'
+STAGES = (STAGE_EXPANSION, STAGE_POSTINGS, STAGE_SCORING, STAGE_RANKING, STAGE_MATERIALIZATION)
+
+COUNTERS = ('number_of_elements', 'number_of_category_elements', 'number_of_postings_scanned',
+            'number_of_postings_lookups', 'number_of_texts_scored', 'number_of_results')
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryProfile:
+    """
+        Timings and counters of one query. The stages are the expansion of the
+        keywords into elements, fetching the postings and statistics of the elements,
+        scoring, sorting or selecting the top k, and looking up the texts. Postings
+        scanned are the entries iterated, postings lookups the texts looked up in
+        the postings of an element.
+    """
+    keywords: List[str] | None
+    k: int | None
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    number_of_elements: int = 0
+    number_of_category_elements: int = 0
+    number_of_postings_scanned: int = 0
+    number_of_postings_lookups: int = 0
+    number_of_texts_scored: int = 0
+    number_of_results: int = 0
+    result_from_cache: bool = False
+
+    def finish_stage(self, stage: str, start: float) -> float:
+        """
+            Adds the time since start to the stage.
+        :param stage: Name of the stage
+        :param start: Value of time.perf_counter when the stage started
+        :return: Current value of time.perf_counter, the start of the next stage
+        """
+        now = time.perf_counter()
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + now - start
+        return now
+
+    def get_total_seconds(self) -> float:
+        return sum(self.stage_seconds.values())
+
+
+class QueryProfiler:
+    """
+        Receives the profile of every query of a TextSearch it is passed to. The
+        profiles are summed up for get_statistics and passed to the hooks, for example
+        to log slow queries. An exception of a hook is logged, so it does not fail the
+        query or the other hooks. Without a profiler no profiles are created.
+    """
+    def __init__(self, hook: Callable[[QueryProfile], None] | None = None):
+        """
+        :param hook: Function called with the profile of every query
+        """
+        self.hooks: List[Callable[[QueryProfile], None]] = [] if hook is None else [hook]
+        self.lock = threading.Lock()
+        self.number_of_queries = 0
+        self.number_of_cached_results = 0
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def add_hook(self, hook: Callable[[QueryProfile], None]):
+        self.hooks.append(hook)
+
+    def record(self, profile: QueryProfile):
+        with self.lock:
+            self.number_of_queries += 1
+            self.number_of_cached_results += profile.result_from_cache
+            for stage, seconds in profile.stage_seconds.items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            for counter in COUNTERS:
+                self.counters[counter] += getattr(profile, counter)
+        for hook in self.hooks:
+            try:
+                hook(profile)
+            except Exception:
+                logger.exception('query profile hook %r failed', hook)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+            Provides the number of queries, the total and average seconds per stage
+            and the totals of the counters of all recorded queries.
+        """
+        with self.lock:
+            number_of_queries = max(self.number_of_queries, 1)
+            return {
+                'number_of_queries': self.number_of_queries,
+                'number_of_cached_results': self.number_of_cached_results,
+                'stage_seconds': dict(self.stage_seconds),
+                'average_stage_seconds': {stage: seconds / number_of_queries
+                                          for stage, seconds in self.stage_seconds.items()},
+                'counters': dict(self.counters)
+            }
+
+    def reset(self):
+        with self.lock:
+            self.number_of_queries = 0
+            self.number_of_cached_results = 0
+            self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+            self.counters = dict.fromkeys(COUNTERS, 0)
@@ -0,0 +1,109 @@
+"""
+    Minimal HTTP server answering queries on an index saved with save_text_index,
+    for local load tests. Start it from the repository root:
+
+        python -m src.search_server --index <directory> --port 8080
+
+    and query it with GET /search?q=man+garden&k=10, the answer is a JSON object
+    with the list of texts.
+"""
+
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import asyncio
+import json
+import logging
+
+from src.async_text_search import AsyncTextSearch, create_process_executor
+from src.mapped_text_index import load_text_index
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+
+MAX_HEADER_LINES = 100
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_connection(async_text_search: AsyncTextSearch, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        for _ in range(MAX_HEADER_LINES):
+            if (await reader.readline()) in (b'\r\n', b'\n', b''):
+                break
+        status, body = await handle_request(async_text_search, request_line)
+        data = json.dumps(body).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + data)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def handle_request(async_text_search: AsyncTextSearch, request_line: List[str]) -> Tuple[str, Dict]:
+    """
+        Answers a request of the form GET /search?q=<keywords separated by spaces>&k=<number>
+        or GET /statistics.
+    :return: HTTP status and the JSON body
+    """
+    if len(request_line) < 2 or request_line[0] != 'GET':
+        return '405 Method Not Allowed', {'error': 'only GET is supported'}
+    url = urlsplit(request_line[1])
+    if url.path == '/statistics':
+        return '200 OK', async_text_search.get_statistics()
+    if url.path != '/search':
+        return '404 Not Found', {'error': f'unknown path {url.path}'}
+    parameters = parse_qs(url.query)
+    keywords = ' '.join(parameters.get('q', [])).split()
+    try:
+        k = int(parameters['k'][0]) if 'k' in parameters else None
+        texts = await async_text_search.find_texts(keywords, k)
+    except ValueError as error:
+        return '400 Bad Request', {'error': str(error)}
+    except asyncio.TimeoutError:
+        return '503 Service Unavailable', {'error': 'timeout'}
+    except Exception:
+        logger.exception('query %s failed', keywords)
+        return '500 Internal Server Error', {'error': 'the query failed'}
+    return '200 OK', {'texts': texts}
+
+
+async def serve(directory: str, host: str, port: int, number_of_processes: int, max_batch_size: int,
+                batch_delay: float, max_pending_queries: int, timeout: float | None):
+    if number_of_processes > 0:
+        async_text_search = AsyncTextSearch(None, create_process_executor(directory, number_of_processes),
+                                            max_batch_size, batch_delay, max_pending_queries, timeout)
+    else:
+        text_search = TextSearch(load_text_index(directory, WordTokenizer.get_shared(use_vectors=False)))
+        async_text_search = AsyncTextSearch(text_search, None, max_batch_size, batch_delay, max_pending_queries,
+                                            timeout)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(async_text_search, reader, writer), host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await async_text_search.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves queries on a saved text index over HTTP.')
+    parser.add_argument('--index', required=True, help='directory of the index written by save_text_index')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--processes', type=int, default=0,
+                        help='number of search processes, 0 to search in a thread of the server process')
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--batch-delay', type=float, default=0.001, help='seconds to wait for more queries')
+    parser.add_argument('--max-pending-queries', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=None, help='seconds after which a query fails')
+    args = parser.parse_args()
+    asyncio.run(serve(args.index, args.host, args.port, args.processes, args.max_batch_size, args.batch_delay,
+                      args.max_pending_queries, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,509 @@
+"""Provides a text index made of segments, so texts can be added while searches run on snapshots."""
+
+from typing import List, Dict, Iterable, Iterator, Tuple
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+import bisect
+import threading
+
+from src.postings import Postings, PostingsStatistics
+from src.text_index import TextIndex, Element, PartialTextIndex, DeletedTexts, IndexStatistics, \
+    compute_index_statistics
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager, WordSet
+
+
+@dataclass
+class Segment:
+    """
+        Container for a part of the texts. The text indices of the segment start
+        at 0, the global text index is the base text index plus the text index in
+        the segment. Only the texts below the number of texts belong to the
+        segment, texts added later are ignored.
+    """
+    base_text_index: int
+    text_index: TextIndex
+    number_of_texts: int
+    level: int
+
+
+class ChainedPostings(Mapping):
+    """
+        Read-only postings of an element over several segments with global text
+        indices. The postings of the segments are used as they are.
+    """
+    def __init__(self, base_text_indices: List[int], postings: List[Mapping[int, int]], max_frequency: int):
+        self.base_text_indices = base_text_indices
+        self.postings = postings
+        self.max_frequency = max_frequency
+        self.length = sum(len(segment_postings) for segment_postings in postings)
+
+    def __getitem__(self, text_index: int) -> int:
+        part = self.__find_part(text_index)
+        if part < 0:
+            raise KeyError(text_index)
+        return self.postings[part][text_index - self.base_text_indices[part]]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __contains__(self, text_index) -> bool:
+        return self.get(text_index) is not None
+
+    def get(self, text_index: int, default=None):
+        part = self.__find_part(text_index)
+        if part < 0:
+            return default
+        return self.postings[part].get(text_index - self.base_text_indices[part], default)
+
+    def get_size_in_bytes(self) -> int:
+        return sum(segment_postings.get_size_in_bytes() for segment_postings in self.postings)
+
+    def get_frequencies(self, text_indices: Iterable[int]) -> List[int]:
+        text_indices = list(text_indices)
+        result = [0] * len(text_indices)
+        part_to_positions_map: Dict[int, List[int]] = {}
+        for position, text_index in enumerate(text_indices):
+            part = self.__find_part(text_index)
+            if part >= 0:
+                part_to_positions_map.setdefault(part, []).append(position)
+        for part, positions in part_to_positions_map.items():
+            base_text_index = self.base_text_indices[part]
+            frequencies = self.postings[part].get_frequencies(text_indices[position] - base_text_index
+                                                              for position in positions)
+            for position, frequency in zip(positions, frequencies):
+                result[position] = frequency
+        return result
+
+    def get_range(self, start: int, end: int) -> Postings:
+        """
+            Provides the postings of the texts with start <= text index < end.
+        """
+        result = Postings()
+        for base_text_index, segment_postings in zip(self.base_text_indices, self.postings):
+            segment_range = segment_postings.get_range(max(start - base_text_index, 0), max(end - base_text_index, 0))
+            result.extend((base_text_index + text_index for text_index in segment_range.keys()),
+                          segment_range.values())
+        return result
+
+    def keys(self) -> Iterable[int]:
+        for base_text_index, segment_postings in zip(self.base_text_indices, self.postings):
+            for text_index in segment_postings.keys():
+                yield base_text_index + text_index
+
+    def values(self) -> Iterable[int]:
+        for segment_postings in self.postings:
+            yield from segment_postings.values()
+
+    def items(self) -> Iterable[Tuple[int, int]]:
+        for base_text_index, segment_postings in zip(self.base_text_indices, self.postings):
+            for text_index, frequency in segment_postings.items():
+                yield base_text_index + text_index, frequency
+
+    def __find_part(self, text_index: int) -> int:
+        return bisect.bisect_right(self.base_text_indices, text_index) - 1
+
+
+class SnapshotTexts(Sequence):
+    """
+        Read-only list of the texts of all segments of a snapshot.
+    """
+    def __init__(self, segments: List[Segment], number_of_texts: int):
+        self.segments = segments
+        self.base_text_indices = [segment.base_text_index for segment in segments]
+        self.number_of_texts = number_of_texts
+
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('text index out of range')
+        segment = self.segments[bisect.bisect_right(self.base_text_indices, idx) - 1]
+        return segment.text_index.texts[idx - segment.base_text_index]
+
+    def __len__(self) -> int:
+        return self.number_of_texts
+
+
+class TextIndexSnapshot:
+    """
+        Consistent read view of a segmented text index. It provides the methods of
+        the text index used by the searches, the statistics (number of texts, text
+        lengths and document frequencies) are combined over all segments, so the
+        scores are the same as for a single text index with the same texts.
+        Texts added or deleted later do not change the snapshot. The snapshot must
+        be created while the segments are not changed, and the number of texts of
+        every segment must be the number of texts of its index at that time.
+    """
+    def __init__(self, segments: List[Segment], word_set_manager: WordSetManager, version: int = 0):
+        self.segments = segments
+        self.word_set_manager = word_set_manager
+        self.version = version
+        self.base_text_indices = [segment.base_text_index for segment in segments]
+        self.number_of_texts = sum(segment.number_of_texts for segment in segments)
+        self.texts = SnapshotTexts(segments, self.number_of_texts)
+        # the segments share the deleted texts with the snapshot until their next delete
+        self.deleted_texts: List[DeletedTexts] = [segment.text_index.get_deleted_texts() for segment in segments]
+        self.number_of_live_texts = 0
+        self.total_text_length = 0
+        self.minimum_text_length = 0
+        for segment in segments:
+            text_index = segment.text_index
+            if text_index.get_number_of_live_texts() == 0:
+                continue
+            minimum_text_length = text_index.get_minimum_text_length()
+            if self.number_of_live_texts == 0 or minimum_text_length < self.minimum_text_length:
+                self.minimum_text_length = minimum_text_length
+            self.number_of_live_texts += text_index.get_number_of_live_texts()
+            self.total_text_length += text_index.total_text_length
+        self.average_text_length = self.total_text_length / self.number_of_live_texts \
+            if self.number_of_live_texts > 0 else 0
+
+    def snapshot(self) -> 'TextIndexSnapshot':
+        return self
+
+    def create_elements_for_text(self, text: str) -> List[Element]:
+        return self.__get_last_text_index().create_elements_for_text(text)
+
+    def create_elements_for_words(self, words: List[str]) -> List[Element]:
+        return self.__get_last_text_index().create_elements_for_words(words)
+
+    def create_category_element(self, category: WordSet) -> Element:
+        return self.__get_last_text_index().create_category_element(category)
+
+    def get_texts_for_element(self, element: Element) -> List[str]:
+        return [self.texts[idx] for idx in self.get_postings(element).keys()]
+
+    def get_elements(self) -> Iterable[Element]:
+        elements = {}
+        for segment in self.segments:
+            elements.update(dict.fromkeys(segment.text_index.get_elements()))
+        return list(elements.keys())
+
+    def get_postings(self, element: Element) -> ChainedPostings:
+        """
+            Provides the postings of the element over all segments with global text indices.
+        :param element: Word or category element
+        :return: Map from text index to element frequency
+        """
+        base_text_indices = []
+        postings = []
+        max_frequency = 0
+        for segment, deleted_texts in zip(self.segments, self.deleted_texts):
+            segment_postings = self.__get_segment_postings(segment, deleted_texts, element)
+            if len(segment_postings) == 0:
+                continue
+            base_text_indices.append(segment.base_text_index)
+            postings.append(segment_postings)
+            max_frequency = max(max_frequency, segment_postings.max_frequency)
+        return ChainedPostings(base_text_indices, postings, max_frequency)
+
+    def get_postings_statistics(self) -> PostingsStatistics:
+        number_of_postings = 0
+        size_in_bytes = 0
+        for segment in self.segments:
+            statistics = segment.text_index.get_postings_statistics()
+            number_of_postings += statistics.number_of_postings
+            size_in_bytes += statistics.size_in_bytes
+        return PostingsStatistics(number_of_terms=len(self.get_elements()), number_of_postings=number_of_postings,
+                                  size_in_bytes=size_in_bytes,
+                                  bytes_per_posting=size_in_bytes / number_of_postings if number_of_postings > 0 else 0)
+
+    def get_index_statistics(self) -> IndexStatistics:
+        return compute_index_statistics(self)
+
+    def get_element_frequency(self, element: Element, text_index: int) -> int:
+        return self.get_postings(element).get(text_index, 0)
+
+    def get_max_element_frequency(self, element: Element) -> int:
+        """
+            Provides the maximum of the maximum frequencies of the segments, without
+            combining their postings. The postings of the mutable segment may contain
+            texts added after the snapshot, so the result is an upper bound.
+        """
+        return max((segment.text_index.get_postings(element, deleted_texts).max_frequency
+                    for segment, deleted_texts in zip(self.segments, self.deleted_texts)), default=0)
+
+    def get_word_length(self, text_index: int) -> int:
+        if 0 <= text_index < self.number_of_texts:
+            segment = self.segments[bisect.bisect_right(self.base_text_indices, text_index) - 1]
+            return segment.text_index.get_word_length(text_index - segment.base_text_index)
+        return 0
+
+    def get_number_of_category_elements(self, category: str) -> int:
+        if category in self.word_set_manager.category_to_sets_map:
+            return len(self.word_set_manager.category_to_sets_map.get(category).elements)
+
+    def get_number_of_texts(self) -> int:
+        return self.number_of_texts
+
+    def get_number_of_live_texts(self) -> int:
+        return self.number_of_live_texts
+
+    def get_text_indices(self) -> Iterable[int]:
+        for segment, deleted_texts in zip(self.segments, self.deleted_texts):
+            for text_index in range(segment.number_of_texts):
+                if text_index not in deleted_texts.text_indices:
+                    yield segment.base_text_index + text_index
+
+    def contains(self, text_index: int) -> bool:
+        if not 0 <= text_index < self.number_of_texts:
+            return False
+        position = bisect.bisect_right(self.base_text_indices, text_index) - 1
+        return text_index - self.base_text_indices[position] not in self.deleted_texts[position].text_indices
+
+    def get_minimum_text_length(self) -> int:
+        return self.minimum_text_length
+
+    def get_average_text_length(self):
+        return self.average_text_length
+
+    def __get_last_text_index(self) -> TextIndex:
+        return self.segments[-1].text_index
+
+    def __get_segment_postings(self, segment: Segment, deleted_texts: DeletedTexts, element: Element) -> Postings:
+        postings = segment.text_index.get_postings(element, deleted_texts)
+        if segment is not self.segments[-1]:
+            return postings
+        # texts may be added to the mutable segment concurrently, so the postings of
+        # the texts belonging to the snapshot are copied
+        return postings.get_range(0, segment.number_of_texts)
+
+
+class SegmentedTextIndex:
+    """
+        Text index for adding texts while searching. New texts are added to a small
+        mutable segment. When it is full, it is frozen and a new one is started.
+        Frozen segments of the same level are merged into one segment of the next
+        level by a background thread, so the number of segments stays small.
+        Searches run on snapshots, which contain the segments at the time the
+        snapshot was taken and are not changed by later adds or merges.
+        Deleted texts are removed from the postings when their segment is merged,
+        the text indices of the other texts do not change.
+    """
+    def __init__(self, word_set_manager: WordSetManager, tokenizer: WordTokenizer, segment_size: int = 10000,
+                 merge_factor: int = 4, compress_postings: bool = False, index_categories: bool = True,
+                 merge_in_background: bool = True):
+        """
+        :param word_set_manager: Word sets used to create the category elements
+        :param tokenizer: Tokenizer to split the texts into words
+        :param segment_size: Number of texts after which the mutable segment is frozen
+        :param merge_factor: Number of frozen segments of the same level that are merged
+        :param compress_postings: If true, the postings of merged segments are compressed
+        :param index_categories: If true, the category elements are indexed for every word
+        :param merge_in_background: If true, segments are merged by a background thread,
+        otherwise they are merged while adding the text that froze the segment
+        """
+        if word_set_manager is None or tokenizer is None:
+            raise ValueError('word set manager and tokenizer must be defined')
+        if segment_size < 1 or merge_factor < 2:
+            raise ValueError('segment size must be at least 1 and merge factor at least 2')
+        self.word_set_manager = word_set_manager
+        self.tokenizer = tokenizer
+        self.segment_size = segment_size
+        self.merge_factor = merge_factor
+        self.compress_postings = compress_postings
+        self.index_categories = index_categories
+        self.frozen_segments: Tuple[Segment, ...] = ()
+        self.text_index = self.__create_text_index(compress_postings=False)
+        self.base_text_index = 0
+        # incremented on every add and delete, merges do not change the texts
+        self.version = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        # an error of the background merge, raised by wait_for_merges and close
+        self.merge_error: Exception | None = None
+        self.merge_thread = None
+        if merge_in_background:
+            self.merge_thread = threading.Thread(target=self.__merge_segments_in_background, daemon=True)
+            self.merge_thread.start()
+
+    def add(self, text: str) -> int | None:
+        """
+            Adds the text to the mutable segment.
+        :param text: Text to add, None is skipped
+        :return: Text index of the added text
+        """
+        if text is None:
+            return None
+        return self.__add_partial_text_index(self.text_index.create_partial_text_index([text]))
+
+    def delete(self, text_index: int):
+        """
+            Marks the text as deleted in the segment containing it.
+        :param text_index: Text index of the text to delete
+        """
+        with self.condition:
+            segment_text_index, segment_text_index_offset = self.__find_segment(text_index)
+            segment_text_index.delete(text_index - segment_text_index_offset)
+            self.version += 1
+
+    def update(self, text_index: int, text: str) -> int:
+        """
+            Replaces a text by deleting it and adding the new text.
+        :param text_index: Text index of the text to replace
+        :param text: New text
+        :return: Text index of the new text
+        """
+        if text is None:
+            raise ValueError('text must be defined')
+        partial_text_index = self.text_index.create_partial_text_index([text])
+        with self.condition:
+            self.delete(text_index)
+            return self.__add_partial_text_index(partial_text_index)
+
+    def add_many(self, texts: Iterable[str], batch_size: int = 1000):
+        """
+            Adds many texts at once. Each batch is tokenized without holding the lock,
+            so searches and other adds are not blocked by the tokenization.
+        :param texts: Texts to add, texts that are None are skipped
+        :param batch_size: Number of texts per batch
+        """
+        if batch_size < 1:
+            raise ValueError('batch size must be at least 1')
+        batch = []
+        for text in texts:
+            if text is None:
+                continue
+            batch.append(text)
+            if len(batch) == batch_size:
+                self.__add_partial_text_index(self.text_index.create_partial_text_index(batch, batch_size))
+                batch = []
+        if len(batch) > 0:
+            self.__add_partial_text_index(self.text_index.create_partial_text_index(batch, batch_size))
+
+    def snapshot(self) -> TextIndexSnapshot:
+        """
+            Provides a consistent read view of all texts added so far.
+        """
+        with self.condition:
+            segments = list(self.frozen_segments)
+            segments.append(Segment(self.base_text_index, self.text_index, self.text_index.get_number_of_texts(), 0))
+            return TextIndexSnapshot(segments, self.word_set_manager, self.version)
+
+    def get_number_of_texts(self) -> int:
+        with self.condition:
+            return self.base_text_index + self.text_index.get_number_of_texts()
+
+    def get_number_of_segments(self) -> int:
+        with self.condition:
+            return len(self.frozen_segments) + 1
+
+    def wait_for_merges(self):
+        """
+            Blocks until all pending merges are done.
+        :raises RuntimeError: If a background merge failed
+        """
+        with self.condition:
+            while not self.closed and self.merge_error is None and self.__find_segments_to_merge() is not None:
+                self.condition.wait()
+            self.__raise_merge_error()
+
+    def close(self):
+        """
+            Stops the background merging, a merge in progress is finished first.
+        :raises RuntimeError: If a background merge failed
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.merge_thread is not None:
+            self.merge_thread.join()
+        with self.condition:
+            self.__raise_merge_error()
+
+    def __raise_merge_error(self):
+        if self.merge_error is not None:
+            raise RuntimeError('merging the segments failed') from self.merge_error
+
+    def __add_partial_text_index(self, partial_text_index: PartialTextIndex) -> int:
+        with self.condition:
+            first_text_index = self.base_text_index + self.text_index.get_number_of_texts()
+            self.text_index.merge(partial_text_index)
+            self.version += 1
+            if self.text_index.get_number_of_texts() < self.segment_size:
+                return first_text_index
+            number_of_texts = self.text_index.get_number_of_texts()
+            self.frozen_segments += (Segment(self.base_text_index, self.text_index, number_of_texts, 0),)
+            self.base_text_index += number_of_texts
+            self.text_index = self.__create_text_index(compress_postings=False)
+            self.condition.notify_all()
+            if self.merge_thread is None:
+                while (segments := self.__find_segments_to_merge()) is not None:
+                    partial_text_indices = [segment.text_index.create_compacted_text_index() for segment in segments]
+                    self.__replace_segments(segments, partial_text_indices,
+                                            self.__merge_segments(segments, partial_text_indices))
+            return first_text_index
+
+    def __merge_segments_in_background(self):
+        try:
+            while True:
+                with self.condition:
+                    while not self.closed and (segments := self.__find_segments_to_merge()) is None:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    partial_text_indices = [segment.text_index.create_compacted_text_index() for segment in segments]
+                # the partial indices are not changed, so they are merged without the lock
+                self.__replace_segments(segments, partial_text_indices,
+                                        self.__merge_segments(segments, partial_text_indices))
+        except Exception as error:
+            # the segments stay unmerged, searches and adds keep working on them
+            with self.condition:
+                self.merge_error = error
+                self.condition.notify_all()
+
+    def __find_segment(self, text_index: int) -> Tuple[TextIndex, int]:
+        """
+        :return: Text index containing the given global text index and its base text index
+        """
+        if text_index >= self.base_text_index:
+            return self.text_index, self.base_text_index
+        base_text_indices = [segment.base_text_index for segment in self.frozen_segments]
+        position = bisect.bisect_right(base_text_indices, text_index) - 1
+        if position < 0:
+            raise ValueError(f'text index {text_index} is not contained')
+        segment = self.frozen_segments[position]
+        return segment.text_index, segment.base_text_index
+
+    def __find_segments_to_merge(self) -> Tuple[Segment, ...] | None:
+        """
+            Frozen segments are appended with level 0 and merged segments get the next
+            level. The oldest segments of a level are merged first, so the levels of the
+            segments never increase from the oldest to the newest segment, even if new
+            segments are frozen while a merge runs.
+        :return: The oldest merge factor neighbouring segments of the same level or None
+        """
+        for start in range(len(self.frozen_segments) - self.merge_factor + 1):
+            segments = self.frozen_segments[start:start + self.merge_factor]
+            if all(segment.level == segments[0].level for segment in segments):
+                return segments
+        return None
+
+    def __merge_segments(self, segments: Tuple[Segment, ...],
+                         partial_text_indices: List[PartialTextIndex]) -> Segment:
+        text_index = self.__create_text_index(self.compress_postings)
+        for partial_text_index in partial_text_indices:
+            text_index.merge(partial_text_index)
+        return Segment(segments[0].base_text_index, text_index, text_index.get_number_of_texts(),
+                       segments[0].level + 1)
+
+    def __replace_segments(self, segments: Tuple[Segment, ...], partial_text_indices: List[PartialTextIndex],
+                           merged_segment: Segment):
+        with self.condition:
+            # texts deleted during the merge are deleted in the merged segment as well
+            for segment, partial_text_index in zip(segments, partial_text_indices):
+                offset = segment.base_text_index - merged_segment.base_text_index
+                for text_index in segment.text_index.deleted_text_indices - partial_text_index.deleted_text_indices:
+                    merged_segment.text_index.delete(offset + text_index)
+            start = next(idx for idx, segment in enumerate(self.frozen_segments) if segment is segments[0])
+            self.frozen_segments = self.frozen_segments[:start] + (merged_segment,) + \
+                self.frozen_segments[start + len(segments):]
+            self.condition.notify_all()
+
+    def __create_text_index(self, compress_postings: bool) -> TextIndex:
+        return TextIndex(self.word_set_manager, self.tokenizer, compress_postings=compress_postings,
+                         index_categories=self.index_categories)
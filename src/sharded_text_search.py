@@ -0,0 +1,90 @@
+"""Searches a saved text index with several worker processes, each scoring a part of the texts."""
+
+from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import itertools
+
+from src.mapped_text_index import load_text_index
+from src.text_index import Element
+from src.text_search import TextSearch, TextIndexAndScore
+from src.word_tokenizer import WordTokenizer
+
+
+class ShardedTextSearch:
+    """
+        Splits the texts of an index saved with save_text_index into shards of
+        neighbouring text indices. Every shard is scored by its own worker process,
+        which memory-maps the same index files, so the processes share the pages
+        of the index. The workers use the statistics of the whole index, so the
+        merged result is the same as the result of TextSearch on the whole index.
+    """
+    def __init__(self, directory: str, number_of_shards: int, tokenizer: WordTokenizer | None = None):
+        """
+        :param directory: Directory of the index written by save_text_index
+        :param number_of_shards: Number of shards, each one is scored by one process
+        :param tokenizer: Tokenizer used to create the elements of the queries
+        """
+        if number_of_shards < 1:
+            raise ValueError('number of shards must be at least 1')
+        if tokenizer is None:
+            tokenizer = WordTokenizer.get_shared(use_vectors=False)
+        self.text_index = load_text_index(directory, tokenizer)
+        number_of_texts = self.text_index.get_number_of_texts()
+        shard_size = -(-number_of_texts // number_of_shards)
+        self.text_index_ranges: List[Tuple[int, int]] = [
+            (start, min(start + shard_size, number_of_texts)) for start in range(0, number_of_texts, max(shard_size, 1))
+        ]
+        # one executor per shard, so every shard is always scored by the same process
+        self.executors = [ProcessPoolExecutor(max_workers=1, initializer=_initialize_worker, initargs=(directory,))
+                          for _ in self.text_index_ranges]
+
+    def find_texts(self, keywords: List[str], k: int | None = None) -> List[str]:
+        """
+            Same as TextSearch.find_texts, but the shards are scored in parallel.
+        :param keywords: List of words representing the user input
+        :param k: If given, only the k best matching texts with a score above 0 are returned
+        :return: Provides the list of matching texts with the best matching text at the
+        beginning of the list
+        """
+        return [self.text_index.texts[item.text_index] for item in self.find_text_indices(keywords, k)]
+
+    def find_text_indices(self, keywords: List[str], k: int | None = None) -> List[TextIndexAndScore]:
+        """
+            Sends the elements of the query to all shards and merges the sorted results
+            of the shards with a k-way merge.
+        :param keywords: List of words representing the user input
+        :param k: If given, only the k best matching texts with a score above 0 are returned
+        :return: Text indices with scores, the best text first
+        """
+        if k is not None and k < 1:
+            raise ValueError('k must be at least 1')
+        keyword_elements = self.text_index.create_elements_for_words(keywords)
+        futures = [executor.submit(_find_text_indices, keyword_elements, k, text_index_range)
+                   for executor, text_index_range in zip(self.executors, self.text_index_ranges)]
+        results = [future.result() for future in futures]
+        merged = heapq.merge(*results, key=lambda x: (-x.score, x.text_index))
+        return list(itertools.islice(merged, k))
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
+
+    def __enter__(self) -> 'ShardedTextSearch':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_worker_text_search: TextSearch | None = None
+
+
+def _initialize_worker(directory: str):
+    global _worker_text_search
+    _worker_text_search = TextSearch(load_text_index(directory, WordTokenizer(use_vectors=False)))
+
+
+def _find_text_indices(keyword_elements: List[Element], k: int | None,
+                       text_index_range: Tuple[int, int]) -> List[TextIndexAndScore]:
+    return _worker_text_search.find_text_indices(keyword_elements, k, text_index_range)
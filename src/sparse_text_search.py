@@ -0,0 +1,181 @@
+"""Implements the extended BM25 search as sparse matrix products on a frozen text index"""
+
+from typing import List, Dict
+import numpy as np
+import scipy.sparse
+
+from src.text_index import TextIndex, Element
+from src.text_search import B, K1
+
+
+class SparseTextSearch:
+    """
+        Freezes a text index into a term-document matrix with precomputed BM25 weights,
+        so a query is scored as sparse matrix times query vector product. Words and
+        categories are kept in separate blocks, because the category scores are
+        combined with the logarithm. Texts added to the text index after the
+        creation are not found.
+    """
+    def __init__(self, text_index: TextIndex):
+        if text_index is None:
+            raise ValueError('text index must be defined')
+        self.text_index = text_index.snapshot()
+        self.number_of_texts = self.text_index.get_number_of_texts()
+        self.is_live = np.zeros(self.number_of_texts, dtype=bool)
+        self.is_live[np.fromiter(self.text_index.get_text_indices(), dtype=np.int64)] = True
+        self.word_to_column_map: Dict[Element, int] = {}
+        self.category_to_column_map: Dict[Element, int] = {}
+        self.word_matrix = self.__create_matrix(self.word_to_column_map, is_category=False)
+        self.category_matrix = self.__create_matrix(self.category_to_column_map, is_category=True)
+
+    def find_texts(self, keywords: List[str], k: int | None = None) -> List[str]:
+        """
+            Same as TextSearch.find_texts, but the scores are computed with the
+            precomputed weights of the matrices.
+        :param keywords: List of words representing the user input
+        :param k: If given, only the k best matching texts with a score above 0 are returned
+        :return: Provides the list of matching texts with the best matching text at the
+        beginning of the list
+        """
+        scores = self.compute_scores(keywords)
+        return [self.text_index.texts[idx] for idx in self.__rank(scores, k)]
+
+    def find_texts_batch(self, keywords_list: List[List[str]], k: int | None = None) -> List[List[str]]:
+        """
+            Finds the texts for many queries at once. The queries are combined into a
+            sparse element x query matrix, so all queries are scored with one sparse
+            matrix product per block.
+        :param keywords_list: List of queries, each a list of words
+        :param k: If given, only the k best matching texts with a score above 0 are
+        returned for each query
+        :return: Provides for each query the same list of texts as find_texts
+        """
+        if k is not None and k < 1:
+            raise ValueError('k must be at least 1')
+        word_to_elements_map: Dict[str, List[Element]] = {}
+        keyword_elements_list = []
+        for keywords in keywords_list:
+            keyword_elements = []
+            for word in keywords:
+                if word not in word_to_elements_map:
+                    word_to_elements_map[word] = self.text_index.create_elements_for_words([word])
+                keyword_elements.extend(word_to_elements_map[word])
+            keyword_elements_list.append(keyword_elements)
+
+        word_scores = self.word_matrix @ self.__create_query_matrix(self.word_to_column_map,
+                                                                    self.word_matrix.shape[1],
+                                                                    keyword_elements_list)
+        category_scores = self.category_matrix @ self.__create_query_matrix(self.category_to_column_map,
+                                                                            self.category_matrix.shape[1],
+                                                                            keyword_elements_list)
+        category_scores = scipy.sparse.csc_matrix(category_scores)
+        category_scores.data = np.log(1 + category_scores.data)
+        scores = scipy.sparse.csc_matrix(word_scores + category_scores)
+
+        result = []
+        for column in range(len(keywords_list)):
+            if k is None:
+                ranked_text_indices = self.__rank(scores[:, column].toarray().ravel(), k)
+            else:
+                start, end = scores.indptr[column], scores.indptr[column + 1]
+                ranked_text_indices = self.__select_top_k(scores.indices[start:end], scores.data[start:end], k)
+            result.append([self.text_index.texts[idx] for idx in ranked_text_indices])
+        return result
+
+    def compute_scores(self, keywords: List[str]) -> np.ndarray:
+        """
+            Computes the scores of all texts for the given keywords.
+        :param keywords: List of words representing the user input
+        :return: Array with the score for every text, indexed by text index
+        """
+        keyword_elements = self.text_index.create_elements_for_words(keywords)
+        word_scores = self.__multiply(self.word_matrix, self.word_to_column_map, keyword_elements)
+        category_scores = self.__multiply(self.category_matrix, self.category_to_column_map, keyword_elements)
+        return word_scores + np.log(1 + category_scores)
+
+    def __create_matrix(self, element_to_column_map: Dict[Element, int], is_category: bool) \
+            -> scipy.sparse.csc_matrix:
+        """
+            Creates the text x element matrix of the BM25 weights for either the words or
+            the categories of the text index.
+        """
+        rows = []
+        frequencies = []
+        columns = []
+        divisors = []
+        document_frequencies = []
+        for element in self.text_index.get_elements():
+            if element.is_category != is_category:
+                continue
+            postings = self.text_index.get_postings(element)
+            if len(postings) == 0:
+                continue
+            column = len(element_to_column_map)
+            element_to_column_map[element] = column
+            rows.extend(postings.keys())
+            frequencies.extend(postings.values())
+            columns.append(np.full(len(postings), column, dtype=np.int64))
+            divisors.append(self.text_index.get_number_of_category_elements(element.category_label)
+                            if is_category else 1)
+            document_frequencies.append(len(postings))
+
+        shape = (self.number_of_texts, len(element_to_column_map))
+        if len(element_to_column_map) == 0:
+            return scipy.sparse.csc_matrix(shape, dtype=np.float64)
+
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.concatenate(columns)
+        document_frequencies = np.array(document_frequencies, dtype=np.float64)
+        frequencies = np.array(frequencies, dtype=np.float64) / np.array(divisors, dtype=np.float64)[columns]
+        lengths = np.array([self.text_index.get_word_length(idx) for idx in range(self.number_of_texts)],
+                           dtype=np.float64)
+        average_length_of_texts = self.text_index.get_average_text_length()
+
+        number_of_live_texts = self.text_index.get_number_of_live_texts()
+        idf = np.log((number_of_live_texts - document_frequencies + 0.5) / (document_frequencies + 0.5) + 1)
+        tdf = (frequencies * (K1 + 1)) / (
+            frequencies + K1 * (1 - B + B * lengths[rows] / average_length_of_texts))
+        return scipy.sparse.csc_matrix((idf[columns] * tdf, (rows, columns)), shape=shape)
+
+    def __multiply(self, matrix: scipy.sparse.csc_matrix, element_to_column_map: Dict[Element, int],
+                   keyword_elements: List[Element]) -> np.ndarray:
+        query = np.zeros(matrix.shape[1], dtype=np.float64)
+        for element in keyword_elements:
+            column = element_to_column_map.get(element)
+            if column is not None:
+                query[column] += 1
+        columns = np.flatnonzero(query)
+        if len(columns) == 0:
+            return np.zeros(self.number_of_texts, dtype=np.float64)
+        return matrix[:, columns] @ query[columns]
+
+    def __create_query_matrix(self, element_to_column_map: Dict[Element, int], number_of_columns: int,
+                              keyword_elements_list: List[List[Element]]) -> scipy.sparse.csc_matrix:
+        rows = []
+        columns = []
+        for column, keyword_elements in enumerate(keyword_elements_list):
+            for element in keyword_elements:
+                row = element_to_column_map.get(element)
+                if row is not None:
+                    rows.append(row)
+                    columns.append(column)
+        # duplicate entries are summed up, so repeated keywords count multiple times
+        return scipy.sparse.csc_matrix((np.ones(len(rows), dtype=np.float64), (rows, columns)),
+                                       shape=(number_of_columns, len(keyword_elements_list)))
+
+    def __rank(self, scores: np.ndarray, k: int | None) -> np.ndarray:
+        if k is None:
+            ranked_text_indices = np.argsort(-scores, kind='stable')
+            return ranked_text_indices[self.is_live[ranked_text_indices]]
+        candidates = np.flatnonzero(scores > 0)
+        return self.__select_top_k(candidates, scores[candidates], k)
+
+    def __select_top_k(self, candidates: np.ndarray, candidate_scores: np.ndarray, k: int) -> np.ndarray:
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        if len(candidates) > k:
+            kth_score = -np.partition(-candidate_scores, k - 1)[k - 1]
+            selected = candidate_scores >= kth_score
+            candidates = candidates[selected]
+            candidate_scores = candidate_scores[selected]
+        return candidates[np.lexsort((candidates, -candidate_scores))][:k]
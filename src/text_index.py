@@ -1,8 +1,14 @@
 """ The text index is inverted index for given set of texts."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 
-from typing import List, Dict, Set
+from array import array
+from typing import List, Dict, Set, FrozenSet, Iterable
+from src.batching import batched
+from src.lru_cache import LRUCache
+from src.postings import Postings, CompressedPostings, LivePostings, PostingsStatistics
 from src.word_tokenizer import WordTokenizer
 from src.word_set_manager import WordSetManager, WordSet
 
@@ -14,6 +20,70 @@ class Element:
     is_category: bool
 
 
+@dataclass
+class PartialTextIndex:
+    """
+        Container for the element frequencies of a batch of texts, which is
+        created independently of the index and merged into it afterwards.
+        Deleted texts keep their text index, but have no text, no length and
+        no postings.
+    """
+    texts: List[str | None]
+    word_lengths: List[int]
+    element_to_postings_map: Dict[Element, Postings]
+    deleted_text_indices: Set[int] = field(default_factory=set)
+
+
+@dataclass
+class IndexStatistics:
+    """
+        Container for the size of an index. The category fan-out of a word is the
+        number of word sets containing it, which is the number of category elements
+        a keyword is expanded to.
+    """
+    number_of_texts: int
+    number_of_live_texts: int
+    number_of_word_terms: int
+    number_of_category_terms: int
+    postings: PostingsStatistics
+    average_category_fan_out: float
+    max_category_fan_out: int
+
+
+@dataclass
+class DeletedTexts:
+    """
+        Container for a copy of the deleted texts of an index, which is not changed
+        by later deletes, so snapshots keep the deleted texts they were created with.
+    """
+    text_indices: FrozenSet[int]
+    term_to_number_of_deleted_texts: Dict[int, int]
+
+
+class TermDictionary:
+    """
+        Assigns a dense integer id, the term, to every element of the index,
+        so the postings can be stored in a list addressed by the term.
+    """
+    def __init__(self):
+        self.element_to_term_map: Dict[Element, int] = {}
+        self.elements: List[Element] = []
+
+    def get_term(self, element: Element) -> int:
+        return self.element_to_term_map.get(element, -1)
+
+    def add(self, element: Element) -> int:
+        term = self.element_to_term_map.get(element)
+        if term is None:
+            term = len(self.elements)
+            self.element_to_term_map[element] = term
+            self.elements.append(element)
+        return term
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+
 class TextIndex:
     """
         Represents an inverted index from element to text.
@@ -22,49 +92,262 @@ class TextIndex:
         In addition, for the BM25 scoring the element frequency and
         average text length is stored.
     """
-    def __init__(self, word_set_manager: WordSetManager, tokenizer: WordTokenizer):
+    def __init__(self, word_set_manager: WordSetManager, tokenizer: WordTokenizer, compress_postings: bool = False,
+                 index_categories: bool = True, category_cache_size: int = 128):
+        """
+        :param word_set_manager: Word sets used to create the category elements
+        :param tokenizer: Tokenizer to split the texts into words
+        :param compress_postings: If true, the postings are stored delta and variable-byte
+        coded in blocks, which needs less memory but is slower to read
+        :param index_categories: If true, the category elements are indexed for every word.
+        Otherwise only the words are indexed and the postings of a category are combined
+        from the postings of its words when needed, so the index is smaller and changes
+        of the word sets do not require to rebuild the index
+        :param category_cache_size: Number of combined category postings that are cached
+        if the categories are not indexed
+        """
         if word_set_manager is None or tokenizer is None:
             raise ValueError('word set manager and tokenizer must be defined')
         self.word_set_manager = word_set_manager
         self.tokenizer = tokenizer
-        self.element_to_text_map: Dict[Element, Set[int]] = {}
-        self.texts: List[str] = []
-        self.text_index_to_word_length_map: Dict[int, int] = {}
+        self.compress_postings = compress_postings
+        self.index_categories = index_categories
+        self.category_postings_cache = LRUCache(category_cache_size)
+        self.category_postings_cache_version = None
+        self.texts: List[str | None] = []
+        self.word_lengths = array('I')
         self.average_text_length = 0
-        self.element_to_text_index_to_frequency_map: Dict[Element, Dict[int, int]] = {}
+        self.total_text_length = 0
+        self.minimum_text_length = 0
+        # number of live texts per word length, so the minimum is updated without a scan on delete
+        self.word_length_counter: Counter = Counter()
+        self.term_dictionary = TermDictionary()
+        self.postings: List[Postings] = []
+        self.category_label_to_element_map: Dict[str, Element] = {}
+        # deleted texts stay in the postings until the index is compacted
+        self.deleted_text_indices: Set[int] = set()
+        self.term_to_number_of_deleted_texts: Dict[int, int] = {}
+        # copy of the deleted texts for snapshots, created again after the next delete
+        self.frozen_deleted_texts: DeletedTexts | None = None
+        # incremented on every change, so users can detect outdated data
+        self.version = 0
+
+    def add(self, text: str) -> int | None:
+        """
+            Adds the text to the index.
+        :param text: Text to add, None is skipped
+        :return: Text index of the added text
+        """
+        if text is None:
+            return None
+        self.merge(self.create_partial_text_index([text]))
+        return len(self.texts) - 1
+
+    def delete(self, text_index: int):
+        """
+            Marks the text as deleted, so it is not found anymore. The number of texts,
+            the text lengths and the document frequencies of the elements of the text
+            are updated at once, the postings are cleaned up by compact.
+        :param text_index: Text index of the text to delete
+        """
+        if not self.contains(text_index):
+            raise ValueError(f'text index {text_index} is not contained')
+        text = self.texts[text_index]
+        words = [] if text.isspace() else set(token.text for token in self.tokenizer.tokenize(text))
+        terms = [self.term_dictionary.get_term(Element(word, None, False)) for word in words]
+        # word sets only grow, so the categories of the words include the categories
+        # indexed for the text, the postings of the categories added later are checked
+        category_terms = {self.term_dictionary.get_term(self.create_category_element(category))
+                          for word in words for category in self.word_set_manager.get_word_sets_for_element(word)}
+        terms.extend(term for term in category_terms if term >= 0 and text_index in self.postings[term])
+        for term in terms:
+            if term >= 0:
+                self.term_to_number_of_deleted_texts[term] = self.term_to_number_of_deleted_texts.get(term, 0) + 1
 
-    def add(self, text: str):
+        self.deleted_text_indices.add(text_index)
+        self.frozen_deleted_texts = None
+        # the word length is kept for snapshots created before the delete
+        word_length = self.word_lengths[text_index]
+        self.total_text_length -= word_length
+        self.word_length_counter[word_length] -= 1
+        if self.word_length_counter[word_length] == 0:
+            del self.word_length_counter[word_length]
+            if word_length == self.minimum_text_length:
+                self.__update_minimum_text_length()
+        number_of_live_texts = self.get_number_of_live_texts()
+        self.average_text_length = self.total_text_length / number_of_live_texts if number_of_live_texts > 0 else 0
+        self.version += 1
+
+    def update(self, text_index: int, text: str) -> int:
+        """
+            Replaces a text by deleting it and adding the new text.
+        :param text_index: Text index of the text to replace
+        :param text: New text
+        :return: Text index of the new text
+        """
         if text is None:
+            raise ValueError('text must be defined')
+        self.delete(text_index)
+        return self.add(text)
+
+    def compact(self):
+        """
+            Removes the deleted texts from the postings and releases their texts. The
+            text indices of the remaining texts do not change.
+        """
+        partial_text_index = self.create_compacted_text_index()
+        self.texts = []
+        self.word_lengths = array('I')
+        self.average_text_length = 0
+        self.total_text_length = 0
+        self.minimum_text_length = 0
+        self.word_length_counter = Counter()
+        self.term_dictionary = TermDictionary()
+        self.postings = []
+        self.deleted_text_indices = set()
+        self.term_to_number_of_deleted_texts = {}
+        self.frozen_deleted_texts = None
+        self.category_postings_cache_version = None
+        self.merge(partial_text_index)
+
+    def create_compacted_text_index(self) -> PartialTextIndex:
+        """
+            Provides the texts and postings of the index without the deleted texts.
+        :return: Partial index that can be merged into an empty index
+        """
+        deleted_texts = self.get_deleted_texts()
+        texts = [None if idx in deleted_texts.text_indices else text for idx, text in enumerate(self.texts)]
+        word_lengths = [0 if idx in deleted_texts.text_indices else word_length
+                        for idx, word_length in enumerate(self.word_lengths)]
+        element_to_postings_map = {}
+        for element in self.term_dictionary.elements:
+            postings = self.get_postings(element, deleted_texts)
+            if len(postings) > 0:
+                element_to_postings_map[element] = postings
+        return PartialTextIndex(texts, word_lengths, element_to_postings_map, set(deleted_texts.text_indices))
+
+    def add_many(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1):
+        """
+            Adds many texts at once. The texts are tokenized in batches, every batch is
+            turned into a partial index and each partial index is merged into this index
+            in one step. With more than one process the partial indices are created by
+            worker processes, each loading a tokenizer with the configuration of this
+            index's tokenizer.
+        :param texts: Texts to add, texts that are None are skipped
+        :param batch_size: Number of texts per batch
+        :param n_process: Number of worker processes used for the tokenization
+        """
+        if batch_size < 1 or n_process < 1:
+            raise ValueError('batch size and number of processes must be at least 1')
+        batches = batched((text for text in texts if text is not None), batch_size)
+        if n_process == 1:
+            for batch in batches:
+                self.merge(self.create_partial_text_index(batch, batch_size))
             return
 
-        self.texts.append(text)
-
-        elements = self.create_elements_for_text(text)
-
-        words = filter(lambda e: not e.is_category, elements)
-        word_length = len(list(words))
-        text_index = len(self.texts) - 1
-        self.text_index_to_word_length_map[text_index] = word_length
-        self.average_text_length = (self.average_text_length * (len(self.texts) - 1) + word_length) / \
-                                   len(self.texts)
-
-        for element in elements:
-            if element in self.element_to_text_index_to_frequency_map:
-                text_index_to_frequency_map = self.element_to_text_index_to_frequency_map.get(element)
-                if text_index in text_index_to_frequency_map:
-                    frequency = text_index_to_frequency_map[text_index]
-                    self.element_to_text_index_to_frequency_map[element][text_index] = frequency + 1
-                else:
-                    self.element_to_text_index_to_frequency_map[element][text_index] = 1
-            else:
-                self.element_to_text_index_to_frequency_map[element] = {}
-                self.element_to_text_index_to_frequency_map[element][text_index] = 1
+        with ProcessPoolExecutor(max_workers=n_process, initializer=_initialize_worker,
+                                 initargs=(self.word_set_manager, self.tokenizer, self.index_categories)) as executor:
+            # only a few batches are pending, so the texts can be streamed
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(_create_partial_text_index, batch, batch_size))
+                if len(pending) >= 2 * n_process:
+                    self.merge(pending.popleft().result())
+            while pending:
+                self.merge(pending.popleft().result())
 
-            if element in self.element_to_text_map:
-                self.element_to_text_map.get(element).add(text_index)
+    def create_partial_text_index(self, texts: List[str], batch_size: int = 1000) -> PartialTextIndex:
+        """
+            Tokenizes the given texts and counts the element frequencies without changing
+            the index. The result can be merged into the index.
+        :param texts: Texts to tokenize
+        :param batch_size: Number of texts the tokenizer processes at once
+        :return: Partial index with the text indices starting at 0
+        """
+        result = PartialTextIndex(texts, [], {})
+        tokenized_texts = self.tokenizer.tokenize_many(texts, batch_size)
+        for text_index, (text, tokens) in enumerate(zip(texts, tokenized_texts)):
+            if text.isspace():
+                word_to_frequency_map = {}
             else:
-                text_index_set = {text_index}
-                self.element_to_text_map[element] = text_index_set
+                word_to_frequency_map = Counter(token.text for token in tokens)
+            result.word_lengths.append(sum(word_to_frequency_map.values()))
+
+            # the elements are created once per distinct word instead of once per token
+            element_to_frequency_map: Dict[Element, int] = {}
+            for word, frequency in word_to_frequency_map.items():
+                element_to_frequency_map[Element(word, None, False)] = frequency
+                if not self.index_categories:
+                    continue
+                for category in self.word_set_manager.get_word_sets_for_element(word):
+                    category_element = self.create_category_element(category)
+                    element_to_frequency_map[category_element] = \
+                        element_to_frequency_map.get(category_element, 0) + frequency
+
+            for element, frequency in element_to_frequency_map.items():
+                if element not in result.element_to_postings_map:
+                    result.element_to_postings_map[element] = Postings()
+                result.element_to_postings_map[element].append(text_index, frequency)
+        return result
+
+    def merge(self, partial_text_index: PartialTextIndex):
+        """
+            Appends the texts of the partial index behind the texts of this index.
+        :param partial_text_index: Partial index created by create_partial_text_index
+        """
+        first_text_index = len(self.texts)
+        # searches may run on snapshots while texts are merged, so the postings of a new
+        # term are complete before the term is added and all postings are extended before
+        # the texts, the postings of texts behind the number of texts are ignored by snapshots
+        for element, partial_postings in partial_text_index.element_to_postings_map.items():
+            text_indices = (first_text_index + text_index for text_index in partial_postings.keys())
+            term = self.term_dictionary.get_term(element)
+            if term >= 0:
+                self.postings[term].extend(text_indices, partial_postings.values())
+                continue
+            postings = CompressedPostings() if self.compress_postings else Postings()
+            postings.extend(text_indices, partial_postings.values())
+            self.postings.append(postings)
+            self.term_dictionary.add(element)
+
+        number_of_live_texts = self.get_number_of_live_texts()
+        self.texts.extend(partial_text_index.texts)
+        self.word_lengths.extend(partial_text_index.word_lengths)
+        if len(partial_text_index.deleted_text_indices) > 0:
+            self.deleted_text_indices.update(first_text_index + text_index
+                                             for text_index in partial_text_index.deleted_text_indices)
+            self.frozen_deleted_texts = None
+        live_word_lengths = [word_length for text_index, word_length in enumerate(partial_text_index.word_lengths)
+                             if text_index not in partial_text_index.deleted_text_indices]
+        if len(live_word_lengths) > 0:
+            minimum_text_length = min(live_word_lengths)
+            if number_of_live_texts == 0 or minimum_text_length < self.minimum_text_length:
+                self.minimum_text_length = minimum_text_length
+        self.total_text_length += sum(live_word_lengths)
+        self.word_length_counter.update(live_word_lengths)
+        if self.get_number_of_live_texts() > 0:
+            self.average_text_length = self.total_text_length / self.get_number_of_live_texts()
+        self.version += 1
+
+    def __update_minimum_text_length(self):
+        """
+            Moves the minimum up to the next length of a live text. The minimum only
+            decreases when texts are merged, so the lengths are passed at most once
+            between two merges.
+        """
+        if len(self.word_length_counter) == 0:
+            self.minimum_text_length = 0
+            return
+        while self.minimum_text_length not in self.word_length_counter:
+            self.minimum_text_length += 1
+
+    def snapshot(self) -> 'TextIndex':
+        """
+            Provides a view of the index that does not change while it is used for a
+            search. Texts are only added to this index by the caller, so the index
+            itself is returned.
+        """
+        return self
 
     def create_elements_for_text(self, text: str) -> List[Element]:
         if text is None or text.isspace():
@@ -84,29 +367,176 @@ class TextIndex:
         return result
 
     def create_category_element(self, category: WordSet) -> Element:
-        return Element(value='<<' + category.get_label() + '>>', category_label=category.label, is_category=True)
+        element = self.category_label_to_element_map.get(category.get_label())
+        if element is None:
+            element = Element(value='<<' + category.get_label() + '>>', category_label=category.label,
+                              is_category=True)
+            self.category_label_to_element_map[category.get_label()] = element
+        return element
 
     def get_texts_for_element(self, element: Element) -> List[str]:
-        if element not in self.element_to_text_map:
-            return []
-        return [self.texts[idx] for idx in self.element_to_text_map.get(element)]
+        return [self.texts[idx] for idx in self.get_postings(element).keys()]
+
+    def get_elements(self) -> Iterable[Element]:
+        if self.index_categories:
+            return self.term_dictionary.elements
+        category_elements = [self.create_category_element(word_set)
+                             for word_set in self.word_set_manager.category_to_sets_map.values()]
+        return self.term_dictionary.elements + category_elements
+
+    def get_postings(self, element: Element, deleted_texts: DeletedTexts | None = None) -> Postings:
+        """
+            Provides the postings of the element, i.e. the texts containing the element
+            together with the frequency of the element in each text. The returned postings
+            belong to the index and must not be modified.
+        :param element: Word or category element
+        :param deleted_texts: Deleted texts to skip, None for the texts deleted so far
+        :return: Map from text index to element frequency
+        """
+        if deleted_texts is None:
+            deleted_text_indices = self.deleted_text_indices
+            term_to_number_of_deleted_texts = self.term_to_number_of_deleted_texts
+        else:
+            deleted_text_indices = deleted_texts.text_indices
+            term_to_number_of_deleted_texts = deleted_texts.term_to_number_of_deleted_texts
+        if element.is_category and not self.index_categories:
+            postings = self.__get_combined_category_postings(element)
+            if len(deleted_text_indices) == 0:
+                return postings
+            return LivePostings(postings, deleted_text_indices)
+        term = self.term_dictionary.get_term(element)
+        if term < 0:
+            return Postings()
+        number_of_deleted_texts = term_to_number_of_deleted_texts.get(term, 0)
+        if number_of_deleted_texts == 0:
+            return self.postings[term]
+        return LivePostings(self.postings[term], deleted_text_indices, number_of_deleted_texts)
+
+    def get_deleted_texts(self) -> DeletedTexts:
+        """
+            Provides a copy of the deleted texts, which is shared until the next delete.
+        """
+        if self.frozen_deleted_texts is None:
+            self.frozen_deleted_texts = DeletedTexts(frozenset(self.deleted_text_indices),
+                                                     dict(self.term_to_number_of_deleted_texts))
+        return self.frozen_deleted_texts
+
+    def __get_combined_category_postings(self, element: Element) -> Postings:
+        """
+            Combines the postings of the words of the category, the frequency of the
+            category in a text is the sum of the frequencies of its words. Deleted texts
+            are included, they are skipped by the caller. The result is cached until
+            texts are added or the word sets change. Every entry keeps the version it was
+            computed for, so a search that started before texts were added does not
+            replace the postings of a later search.
+        """
+        version = (self.word_set_manager.version, len(self.texts))
+        if self.category_postings_cache_version != version:
+            self.category_postings_cache.clear()
+            self.category_postings_cache_version = version
+        version_and_postings = self.category_postings_cache.get(element.category_label)
+        if version_and_postings is not None and version_and_postings[0] == version:
+            return version_and_postings[1]
+
+        text_index_to_frequency_map: Dict[int, int] = {}
+        word_set = self.word_set_manager.category_to_sets_map.get(element.category_label)
+        words = word_set.get_elements() if word_set is not None else set()
+        for word in words:
+            term = self.term_dictionary.get_term(Element(word, None, False))
+            if term < 0:
+                continue
+            for text_index, frequency in self.postings[term].items():
+                text_index_to_frequency_map[text_index] = text_index_to_frequency_map.get(text_index, 0) + frequency
+        text_indices = sorted(text_index_to_frequency_map.keys())
+        postings = Postings()
+        postings.extend(text_indices, [text_index_to_frequency_map[text_index] for text_index in text_indices])
+        self.category_postings_cache.put(element.category_label, (version, postings))
+        return postings
+
+    def get_postings_statistics(self) -> PostingsStatistics:
+        number_of_postings = sum(len(postings) for postings in self.postings)
+        size_in_bytes = sum(postings.get_size_in_bytes() for postings in self.postings)
+        return PostingsStatistics(number_of_terms=len(self.postings), number_of_postings=number_of_postings,
+                                  size_in_bytes=size_in_bytes,
+                                  bytes_per_posting=size_in_bytes / number_of_postings if number_of_postings > 0 else 0)
+
+    def get_index_statistics(self) -> IndexStatistics:
+        return compute_index_statistics(self)
 
     def get_element_frequency(self, element: Element, text_index: int) -> int:
-        if element not in self.element_to_text_index_to_frequency_map:
-            return 0
-        text_index_to_frequency_map = self.element_to_text_index_to_frequency_map.get(element)
-        if text_index in text_index_to_frequency_map:
-            return text_index_to_frequency_map[text_index]
-        return 0
+        return self.get_postings(element).get(text_index, 0)
+
+    def get_max_element_frequency(self, element: Element) -> int:
+        return self.get_postings(element).max_frequency
 
     def get_word_length(self, text_index: int) -> int:
-        if text_index in self.text_index_to_word_length_map:
-            return self.text_index_to_word_length_map.get(text_index)
+        if 0 <= text_index < len(self.word_lengths):
+            return self.word_lengths[text_index]
         return 0
 
     def get_number_of_category_elements(self, category: str) -> int:
         if category in self.word_set_manager.category_to_sets_map:
             return len(self.word_set_manager.category_to_sets_map.get(category).elements)
 
+    def get_number_of_texts(self) -> int:
+        """
+            Provides the number of text indices including the deleted texts.
+        """
+        return len(self.texts)
+
+    def get_number_of_live_texts(self) -> int:
+        return len(self.texts) - len(self.deleted_text_indices)
+
+    def get_text_indices(self) -> Iterable[int]:
+        """
+            Provides the text indices of the texts that are not deleted.
+        """
+        return (text_index for text_index in range(len(self.texts)) if text_index not in self.deleted_text_indices)
+
+    def contains(self, text_index: int) -> bool:
+        return 0 <= text_index < len(self.texts) and text_index not in self.deleted_text_indices
+
+    def get_minimum_text_length(self) -> int:
+        return self.minimum_text_length
+
     def get_average_text_length(self):
         return self.average_text_length
+
+
+_worker_text_index: TextIndex | None = None
+
+
+def compute_index_statistics(text_index: TextIndex) -> IndexStatistics:
+    """
+        Computes the statistics of a text index or of an object providing the same
+        read methods, for example a snapshot.
+    """
+    number_of_word_terms = 0
+    number_of_category_terms = 0
+    total_category_fan_out = 0
+    max_category_fan_out = 0
+    for element in text_index.get_elements():
+        if element.is_category:
+            number_of_category_terms += 1
+            continue
+        number_of_word_terms += 1
+        category_fan_out = len(text_index.word_set_manager.get_word_sets_for_element(element.value))
+        total_category_fan_out += category_fan_out
+        max_category_fan_out = max(max_category_fan_out, category_fan_out)
+    return IndexStatistics(
+        number_of_texts=text_index.get_number_of_texts(),
+        number_of_live_texts=text_index.get_number_of_live_texts(),
+        number_of_word_terms=number_of_word_terms,
+        number_of_category_terms=number_of_category_terms,
+        postings=text_index.get_postings_statistics(),
+        average_category_fan_out=total_category_fan_out / number_of_word_terms if number_of_word_terms > 0 else 0,
+        max_category_fan_out=max_category_fan_out)
+
+
+def _initialize_worker(word_set_manager: WordSetManager, tokenizer: WordTokenizer, index_categories: bool):
+    global _worker_text_index
+    _worker_text_index = TextIndex(word_set_manager, tokenizer, index_categories=index_categories)
+
+
+def _create_partial_text_index(texts: List[str], batch_size: int) -> PartialTextIndex:
+    return _worker_text_index.create_partial_text_index(texts, batch_size)
@@ -1,10 +1,22 @@
 """Implements the similarity search for texts using an extended BM25 score formular"""
 
-from typing import List
+from typing import List, Dict, Iterable, Iterator, Tuple, Mapping
+import heapq
 import math
+import time
+from collections import Counter
 from dataclasses import dataclass
+from src.lru_cache import LRUCache
+from src.query_profile import QueryProfile, QueryProfiler, STAGE_EXPANSION, STAGE_POSTINGS, STAGE_SCORING, \
+    STAGE_RANKING, STAGE_MATERIALIZATION
 from src.text_index import TextIndex, Element
 
+B = 0.75
+K1 = 1.5
+
+# marks a missing cache entry, because None is a valid cached value
+_NOT_CACHED = object()
+
 
 @dataclass
 class TextIndexAndScore:
@@ -16,71 +28,561 @@ class TextIndexAndScore:
     score: float
 
 
+@dataclass
+class ResultPage:
+    """
+        Container for one page of matching texts. The cursor is passed to get the
+        next page, it is None on the last page.
+    """
+    results: List[TextIndexAndScore]
+    next_cursor: str | None
+
+
+@dataclass
+class ElementStatistics:
+    """
+        Container for the values of an element that only depend on the index and
+        not on the query. The postings map text index to frequency and provide
+        get_frequencies for lookups of several texts.
+    """
+    postings: Mapping[int, int]
+    idf: float
+    frequency_divisor: int
+    max_tdf: float
+
+
+@dataclass
+class KeywordWeight:
+    """
+        Container for the values of a query element that are the same for all texts,
+        so they are computed only once per query. The term frequency components of
+        the postings can be provided if they are shared with other queries.
+    """
+    element: Element
+    statistics: ElementStatistics
+    multiplicity: int
+    upper_bound: float
+    text_index_to_tdf_map: Dict[int, float] | None = None
+
+
 class TextSearch:
     """
         Search for texts matching the given query keywords using a BM25 scoring
         with an extension to match the word categories as well.
     """
-    def __init__(self, text_index: TextIndex):
+    def __init__(self, text_index: TextIndex, element_cache_size: int = 1024, statistics_cache_size: int = 1024,
+                 result_cache_size: int = 0, profiler: QueryProfiler | None = None):
+        """
+        :param text_index: Index to search, every search uses a snapshot of it
+        :param element_cache_size: Number of keywords whose word and category elements are cached
+        :param statistics_cache_size: Number of elements whose postings, IDF and category size are cached
+        :param result_cache_size: Number of query results of find_texts that are cached, 0 disables it
+        :param profiler: If given, timings and counters of every query are passed to it
+        """
         self.text_index = text_index
+        self.profiler = profiler
+        # the caches are cleared when the texts or the word sets change
+        self.element_cache = LRUCache(element_cache_size)
+        self.statistics_cache = LRUCache(statistics_cache_size)
+        self.result_cache = LRUCache(result_cache_size)
 
-    def find_texts(self, keywords: List[str]) -> List[str]:
+    def find_texts(self, keywords: List[str], k: int | None = None) -> List[str]:
         """
             Using the given keywords the score for all texts is computed to find the best
             matching texts.
         :param keywords: List of words representing the user input
+        :param k: If given, only the k best matching texts with a score above 0 are
+        returned and texts that cannot reach the top k are skipped during scoring
         :return: Provides the list of matching texts with the best matching text at the
         beginning of the list
         """
-        keyword_elements = self.text_index.create_elements_for_words(keywords)
-        text_indices_with_scores = self.__compute_scores(keyword_elements)
-        sorted_text_indices = sorted(text_indices_with_scores, key=lambda x: x.score, reverse=True)
-        return [self.text_index.texts[item.text_index] for item in sorted_text_indices]
+        if k is not None and k < 1:
+            raise ValueError('k must be at least 1')
+        snapshot = self.text_index.snapshot()
+        profile = QueryProfile(keywords, k) if self.profiler is not None else None
+        key = None
+        if self.result_cache.max_size > 0:
+            # the order of the keywords does not change the scores
+            keywords = sorted(keywords)
+            key = (self.__get_version(snapshot), tuple(keywords), k)
+            self.result_cache.invalidate(key[0])
+            result = self.result_cache.get(key)
+            if result is not None:
+                if profile is not None:
+                    profile.result_from_cache = True
+                    profile.number_of_results = len(result)
+                    self.profiler.record(profile)
+                return list(result)
+        keyword_elements = self.__create_elements_for_words(snapshot, keywords, profile)
+        keyword_weights = self.__create_keyword_weights(snapshot, keyword_elements, {}, profile=profile)
+        result = self.__find_texts_for_keyword_weights(snapshot, keyword_weights, k, profile)
+        if key is not None:
+            self.result_cache.put(key, list(result))
+        if profile is not None:
+            self.profiler.record(profile)
+        return result
 
-    def __compute_scores(self, keywords: List[Element]) -> List[TextIndexAndScore]:
+    def find_text_indices(self, keyword_elements: List[Element], k: int | None = None,
+                          text_index_range: Tuple[int, int] | None = None) -> List[TextIndexAndScore]:
+        """
+            Scores the texts for the given query elements. If a range is given, only the
+            texts in the range are scored, but IDF and text lengths are still taken from
+            the whole index, so the scores are the same as without a range. This allows
+            to score parts of an index independently and merge the results.
+        :param keyword_elements: Word and category elements of the query
+        :param k: If given, only the k best texts with a score above 0 are returned
+        :param text_index_range: Start (inclusive) and end (exclusive) text index of the
+        texts to score, None for all texts
+        :return: Text indices with scores, the best text first and texts with the same
+        score ordered by text index
+        """
+        if k is not None and k < 1:
+            raise ValueError('k must be at least 1')
+        snapshot = self.text_index.snapshot()
+        profile = QueryProfile(None, k) if self.profiler is not None else None
+        if profile is not None:
+            profile.number_of_elements = len(keyword_elements)
+            profile.number_of_category_elements = sum(element.is_category for element in keyword_elements)
+        keyword_weights = self.__create_keyword_weights(snapshot, keyword_elements, {}, text_index_range, profile)
+        result = self.__find_text_indices_for_keyword_weights(snapshot, keyword_weights, k, text_index_range,
+                                                              profile)
+        if profile is not None:
+            profile.number_of_results = len(result)
+            self.profiler.record(profile)
+        return result
+
+    def find_texts_batch(self, keywords_list: List[List[str]], k: int | None = None) -> List[List[str]]:
+        """
+            Finds the texts for many queries at once. The elements of every distinct word,
+            the statistics of every distinct element and the term frequency components of
+            elements used by several queries are computed only once for the whole batch.
+        :param keywords_list: List of queries, each a list of words
+        :param k: If given, only the k best matching texts with a score above 0 are
+        returned for each query
+        :return: Provides for each query the same list of texts as find_texts
+        """
+        if k is not None and k < 1:
+            raise ValueError('k must be at least 1')
+        snapshot = self.text_index.snapshot()
+        profiles = [QueryProfile(keywords, k) if self.profiler is not None else None for keywords in keywords_list]
+        keyword_elements_list = [self.__create_elements_for_words(snapshot, keywords, profile)
+                                 for keywords, profile in zip(keywords_list, profiles)]
+
+        # term frequency components are kept only while queries using them are pending
+        element_to_number_of_queries = Counter(element for keyword_elements in keyword_elements_list
+                                               for element in set(keyword_elements))
+        element_to_statistics_map: Dict[Element, ElementStatistics] = {}
+        element_to_tdf_map: Dict[Element, Dict[int, float]] = {}
+        average_length_of_texts = snapshot.get_average_text_length()
         result = []
-        for idx in range(len(self.text_index.texts)):
-            score_value = 0
-            score_categories = 0
-            number_of_category_keywords = 0
-            score = 0
-            for keyword in keywords:
-                score += self.__compute_score_for_keyword(keyword, idx)
-                if keyword.is_category:
-                    score_categories += score
-                    number_of_category_keywords += 1
-                else:
-                    score_value += score
-            if number_of_category_keywords > 0:
-                total_score = score_value + math.log(1 + score_categories)
+        for keyword_elements, profile in zip(keyword_elements_list, profiles):
+            keyword_weights = self.__create_keyword_weights(snapshot, keyword_elements, element_to_statistics_map,
+                                                            profile=profile)
+            start = time.perf_counter() if profile is not None else 0.0
+            for keyword_weight in keyword_weights:
+                element = keyword_weight.element
+                if element in element_to_tdf_map:
+                    keyword_weight.text_index_to_tdf_map = element_to_tdf_map[element]
+                elif element_to_number_of_queries[element] > 1:
+                    keyword_weight.text_index_to_tdf_map = {
+                        text_index: self.__compute_tdf_for_frequency(snapshot, keyword_weight, text_index, frequency,
+                                                                     average_length_of_texts)
+                        for text_index, frequency in keyword_weight.statistics.postings.items()
+                    }
+                    element_to_tdf_map[element] = keyword_weight.text_index_to_tdf_map
+                    if profile is not None:
+                        profile.number_of_postings_scanned += len(keyword_weight.statistics.postings)
+            if profile is not None:
+                profile.finish_stage(STAGE_SCORING, start)
+            result.append(self.__find_texts_for_keyword_weights(snapshot, keyword_weights, k, profile))
+            for element in set(keyword_elements):
+                element_to_number_of_queries[element] -= 1
+                if element_to_number_of_queries[element] == 0:
+                    element_to_tdf_map.pop(element, None)
+            if profile is not None:
+                self.profiler.record(profile)
+        return result
+
+    def find_page(self, keywords: List[str], page_size: int = 10, cursor: str | None = None) -> ResultPage:
+        """
+            Provides the matching texts page by page as text indices and scores, the
+            texts themselves are not looked up. The cursor contains the score and text
+            index of the last text of the previous page and the version of the index and
+            the word sets. Adding or deleting texts or changing the word sets changes all
+            scores, so a cursor of an older version is rejected. Only texts with a score
+            above 0 are returned, in the same order as by find_texts.
+        :param keywords: List of words representing the user input
+        :param page_size: Maximum number of texts per page
+        :param cursor: Cursor of the previous page, None for the first page
+        :return: The texts of the page and the cursor of the next page
+        :raises ValueError: If the cursor is invalid or the index changed since it was created
+        """
+        if page_size < 1:
+            raise ValueError('page size must be at least 1')
+        snapshot = self.text_index.snapshot()
+        version = self.__get_version(snapshot)
+        last_key = self.__parse_cursor(cursor, version) if cursor is not None else None
+        profile = QueryProfile(keywords, page_size) if self.profiler is not None else None
+        keyword_elements = self.__create_elements_for_words(snapshot, keywords, profile)
+        keyword_weights = self.__create_keyword_weights(snapshot, keyword_elements, {}, profile=profile)
+        # one more text than the page size shows if there is a next page
+        if last_key is None:
+            keys = [(-item.score, item.text_index)
+                    for item in self.__compute_top_k_scores(snapshot, keyword_weights, page_size + 1, profile)]
+        else:
+            text_index_to_score_map = self.__compute_text_scores(snapshot, keyword_weights, profile)
+            start = time.perf_counter() if profile is not None else 0.0
+            keys = heapq.nsmallest(page_size + 1, (key for key in ((-score, text_index) for text_index, score
+                                                                   in text_index_to_score_map.items())
+                                                   if key > last_key))
+            if profile is not None:
+                profile.finish_stage(STAGE_RANKING, start)
+        results = [TextIndexAndScore(text_index, -negative_score) for negative_score, text_index in keys[:page_size]]
+        next_cursor = None
+        if len(keys) > page_size:
+            next_cursor = f'{version[0]}:{version[1]}:{results[-1].score!r}:{results[-1].text_index}'
+        if profile is not None:
+            profile.number_of_results = len(results)
+            self.profiler.record(profile)
+        return ResultPage(results, next_cursor)
+
+    def iterate_texts(self, keywords: List[str]) -> Iterator[Tuple[TextIndexAndScore, str]]:
+        """
+            Provides the matching texts one after another. The texts are scored once,
+            but they are only sorted and looked up when they are reached, so reading
+            the first results does not create a list of all texts.
+        :param keywords: List of words representing the user input
+        :return: Generator of text index and score together with the text, the best text
+        first, only texts with a score above 0 are provided
+        """
+        snapshot = self.text_index.snapshot()
+        profile = QueryProfile(keywords, None) if self.profiler is not None else None
+        keyword_elements = self.__create_elements_for_words(snapshot, keywords, profile)
+        keyword_weights = self.__create_keyword_weights(snapshot, keyword_elements, {}, profile=profile)
+        keys = [(-score, text_index) for text_index, score in
+                self.__compute_text_scores(snapshot, keyword_weights, profile).items()]
+        heapq.heapify(keys)
+        if profile is not None:
+            self.profiler.record(profile)
+        while len(keys) > 0:
+            negative_score, text_index = heapq.heappop(keys)
+            yield TextIndexAndScore(text_index, -negative_score), snapshot.texts[text_index]
+
+    def get_texts(self, text_indices: Iterable[int]) -> List[str]:
+        """
+            Looks up the texts of a page.
+        :param text_indices: Text indices, for example of the results of find_page
+        :return: The texts in the same order
+        """
+        texts = self.text_index.snapshot().texts
+        return [texts[text_index] for text_index in text_indices]
+
+    def get_cache_statistics(self) -> Dict[str, Dict[str, int]]:
+        """
+            Provides the number of hits, misses and entries of the element, statistics
+            and result caches to see how effective they are.
+        """
+        return {name: {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache)}
+                for name, cache in [('elements', self.element_cache), ('statistics', self.statistics_cache),
+                                    ('results', self.result_cache)]}
+
+    def __parse_cursor(self, cursor: str, version: Tuple[int, int]) -> Tuple[float, int]:
+        try:
+            word_set_version, text_index_version, score, text_index = cursor.split(':')
+            cursor_version = (int(word_set_version), int(text_index_version))
+            last_key = (-float(score), int(text_index))
+        except ValueError:
+            raise ValueError(f'invalid cursor {cursor}') from None
+        if cursor_version != version:
+            raise ValueError('cursor is outdated, the index or the word sets changed')
+        return last_key
+
+    def __get_version(self, snapshot: TextIndex) -> Tuple[int, int]:
+        return snapshot.word_set_manager.version, snapshot.version
+
+    def __create_elements_for_words(self, snapshot: TextIndex, words: List[str],
+                                    profile: QueryProfile | None = None) -> List[Element]:
+        """
+            Creates the word and category elements of the keywords, the elements of
+            every keyword are cached until the word sets change.
+        """
+        start = time.perf_counter() if profile is not None else 0.0
+        version = snapshot.word_set_manager.version
+        self.element_cache.invalidate(version)
+        result = []
+        for word in words:
+            elements = self.element_cache.get((version, word))
+            if elements is None:
+                elements = snapshot.create_elements_for_words([word])
+                self.element_cache.put((version, word), elements)
+            result.extend(elements)
+        if profile is not None:
+            profile.finish_stage(STAGE_EXPANSION, start)
+            profile.number_of_elements = len(result)
+            profile.number_of_category_elements = sum(element.is_category for element in result)
+        return result
+
+    def __find_texts_for_keyword_weights(self, snapshot: TextIndex, keyword_weights: List[KeywordWeight],
+                                         k: int | None, profile: QueryProfile | None = None) -> List[str]:
+        sorted_text_indices = self.__find_text_indices_for_keyword_weights(snapshot, keyword_weights, k,
+                                                                           profile=profile)
+        start = time.perf_counter() if profile is not None else 0.0
+        result = [snapshot.texts[item.text_index] for item in sorted_text_indices]
+        if profile is not None:
+            profile.finish_stage(STAGE_MATERIALIZATION, start)
+            profile.number_of_results = len(result)
+        return result
+
+    def __find_text_indices_for_keyword_weights(self, snapshot: TextIndex, keyword_weights: List[KeywordWeight],
+                                                k: int | None, text_index_range: Tuple[int, int] | None = None,
+                                                profile: QueryProfile | None = None) -> List[TextIndexAndScore]:
+        if k is not None:
+            return self.__compute_top_k_scores(snapshot, keyword_weights, k, profile)
+        if text_index_range is None:
+            text_indices = snapshot.get_text_indices()
+        else:
+            text_indices = (idx for idx in range(*text_index_range) if snapshot.contains(idx))
+        text_index_to_score_map = self.__compute_text_scores(snapshot, keyword_weights, profile)
+        start = time.perf_counter() if profile is not None else 0.0
+        text_indices_with_scores = [TextIndexAndScore(idx, text_index_to_score_map.get(idx, 0.0))
+                                    for idx in text_indices]
+        result = sorted(text_indices_with_scores, key=lambda x: x.score, reverse=True)
+        if profile is not None:
+            profile.finish_stage(STAGE_RANKING, start)
+        return result
+
+    def __compute_text_scores(self, snapshot: TextIndex, keyword_weights: List[KeywordWeight],
+                              profile: QueryProfile | None) -> Dict[int, float]:
+        start = time.perf_counter() if profile is not None else 0.0
+        text_index_to_score_map = self.__compute_scores(snapshot, keyword_weights)
+        if profile is not None:
+            profile.finish_stage(STAGE_SCORING, start)
+            profile.number_of_postings_scanned += sum(len(keyword_weight.statistics.postings)
+                                                      for keyword_weight in keyword_weights)
+            profile.number_of_texts_scored += len(text_index_to_score_map)
+        return text_index_to_score_map
+
+    def __create_keyword_weights(self, snapshot: TextIndex, keywords: List[Element],
+                                 element_to_statistics_map: Dict[Element, ElementStatistics],
+                                 text_index_range: Tuple[int, int] | None = None,
+                                 profile: QueryProfile | None = None) -> List[KeywordWeight]:
+        """
+            Computes document frequency, IDF, category size and the upper bound of the
+            score once for every distinct query element.
+        :param keywords: Word and category elements of the query
+        :param element_to_statistics_map: Statistics of elements that are already known,
+        the statistics of the other elements are added
+        :param text_index_range: If given, the postings are restricted to the texts in the range
+        :return: Weights of the elements found in the index, the element with the
+        highest upper bound first
+        """
+        start = time.perf_counter() if profile is not None else 0.0
+        result = []
+        for keyword, multiplicity in Counter(keywords).items():
+            if keyword in element_to_statistics_map:
+                statistics = element_to_statistics_map[keyword]
+            else:
+                statistics = self.__get_element_statistics(snapshot, keyword, text_index_range)
+                element_to_statistics_map[keyword] = statistics
+            if statistics is None:
+                continue
+            upper_bound = multiplicity * statistics.idf * statistics.max_tdf
+            result.append(KeywordWeight(keyword, statistics, multiplicity, upper_bound))
+        result.sort(key=lambda x: x.upper_bound, reverse=True)
+        if profile is not None:
+            profile.finish_stage(STAGE_POSTINGS, start)
+        return result
+
+    def __get_element_statistics(self, snapshot: TextIndex, element: Element,
+                                 text_index_range: Tuple[int, int] | None) -> ElementStatistics | None:
+        """
+            Provides the statistics of the element, which are cached until the texts or
+            the word sets change.
+        """
+        version = self.__get_version(snapshot)
+        self.statistics_cache.invalidate(version)
+        key = (version, element, text_index_range)
+        statistics = self.statistics_cache.get(key, _NOT_CACHED)
+        if statistics is _NOT_CACHED:
+            statistics = self.__create_element_statistics(snapshot, element, text_index_range)
+            self.statistics_cache.put(key, statistics)
+        return statistics
+
+    def __create_element_statistics(self, snapshot: TextIndex, element: Element,
+                                    text_index_range: Tuple[int, int] | None) -> ElementStatistics | None:
+        postings = snapshot.get_postings(element)
+        if len(postings) == 0:
+            return None
+        idf = self.__compute_idf(snapshot.get_number_of_live_texts(), len(postings))
+        if text_index_range is not None:
+            postings = postings.get_range(*text_index_range)
+            if len(postings) == 0:
+                return None
+        if element.is_category:
+            frequency_divisor = snapshot.get_number_of_category_elements(element.category_label)
+        else:
+            frequency_divisor = 1
+        max_frequency = snapshot.get_max_element_frequency(element)
+        max_tdf = self.__compute_tdf(max_frequency / frequency_divisor,
+                                     snapshot.get_minimum_text_length(),
+                                     snapshot.get_average_text_length())
+        return ElementStatistics(postings, idf, frequency_divisor, max_tdf)
+
+    def __compute_scores(self, snapshot: TextIndex, keyword_weights: List[KeywordWeight]) -> Dict[int, float]:
+        """
+            Computes the scores term at a time: only the postings of the keywords are
+            visited and the scores of the texts found there are accumulated. Texts that
+            do not contain any keyword are not part of the result, their score is 0.
+        :param keyword_weights: Weights of the word and category elements of the query
+        :return: Map from text index to score for all texts containing a keyword
+        """
+        average_length_of_texts = snapshot.get_average_text_length()
+        text_index_to_value_score_map: Dict[int, float] = {}
+        text_index_to_category_score_map: Dict[int, float] = {}
+        for keyword_weight in keyword_weights:
+            if keyword_weight.element.is_category:
+                text_index_to_score_map = text_index_to_category_score_map
             else:
-                total_score = score_value
-            result.append(TextIndexAndScore(idx, total_score))
+                text_index_to_score_map = text_index_to_value_score_map
+            weight = keyword_weight.multiplicity * keyword_weight.statistics.idf
+            for text_index, tdf in self.__get_tdfs(snapshot, keyword_weight, average_length_of_texts):
+                text_index_to_score_map[text_index] = text_index_to_score_map.get(text_index, 0.0) + weight * tdf
+
+        result = text_index_to_value_score_map
+        for text_index, score_categories in text_index_to_category_score_map.items():
+            result[text_index] = result.get(text_index, 0.0) + math.log(1 + score_categories)
         return result
 
-    def __compute_score_for_keyword(self, keyword: Element, text_index: int) -> float:
+    def __compute_top_k_scores(self, snapshot: TextIndex, keyword_weights: List[KeywordWeight],
+                               k: int, profile: QueryProfile | None = None) -> List[TextIndexAndScore]:
+        """
+            Computes the k best scores using a term at a time variant of MaxScore. The
+            elements are processed in the order of their upper bound. Before each element
+            the k-th best partial score is used as threshold: texts whose partial score
+            plus the upper bound of the remaining elements stays below the threshold are
+            dropped, and once the remaining elements alone cannot reach the threshold no
+            new texts are accepted anymore.
+        :param keyword_weights: Weights of the word and category elements of the query
+        :param k: Number of texts to find
+        :param profile: If given, the timings and counters are added to it
+        :return: The k best texts with a score above 0, the best text first
+        """
+        start = time.perf_counter() if profile is not None else 0.0
+        average_length_of_texts = snapshot.get_average_text_length()
+        remaining_value_bounds = [0.0] * (len(keyword_weights) + 1)
+        remaining_category_bounds = [0.0] * (len(keyword_weights) + 1)
+        for idx in range(len(keyword_weights) - 1, -1, -1):
+            keyword_weight = keyword_weights[idx]
+            remaining_value_bounds[idx] = remaining_value_bounds[idx + 1]
+            remaining_category_bounds[idx] = remaining_category_bounds[idx + 1]
+            if keyword_weight.element.is_category:
+                remaining_category_bounds[idx] += keyword_weight.upper_bound
+            else:
+                remaining_value_bounds[idx] += keyword_weight.upper_bound
+
+        text_index_to_value_score_map: Dict[int, float] = {}
+        text_index_to_category_score_map: Dict[int, float] = {}
+        accept_new_texts = True
+        for idx, keyword_weight in enumerate(keyword_weights):
+            if idx > 0 and len(text_index_to_value_score_map) >= k:
+                threshold = self.__find_threshold(text_index_to_value_score_map,
+                                                  text_index_to_category_score_map, k)
+                remaining_value_bound = remaining_value_bounds[idx]
+                remaining_category_bound = remaining_category_bounds[idx]
+                accept_new_texts = remaining_value_bound + math.log(1 + remaining_category_bound) >= threshold
+                for text_index in list(text_index_to_value_score_map.keys()):
+                    score_categories = text_index_to_category_score_map[text_index] + remaining_category_bound
+                    upper_bound = text_index_to_value_score_map[text_index] + remaining_value_bound + \
+                        math.log(1 + score_categories)
+                    if upper_bound < threshold:
+                        del text_index_to_value_score_map[text_index]
+                        del text_index_to_category_score_map[text_index]
+
+            if keyword_weight.element.is_category:
+                text_index_to_score_map = text_index_to_category_score_map
+            else:
+                text_index_to_score_map = text_index_to_value_score_map
+            weight = keyword_weight.multiplicity * keyword_weight.statistics.idf
+
+            if accept_new_texts:
+                number_of_texts = len(text_index_to_value_score_map)
+                for text_index, tdf in self.__get_tdfs(snapshot, keyword_weight, average_length_of_texts):
+                    if text_index not in text_index_to_value_score_map:
+                        text_index_to_value_score_map[text_index] = 0.0
+                        text_index_to_category_score_map[text_index] = 0.0
+                    text_index_to_score_map[text_index] += weight * tdf
+                if profile is not None:
+                    profile.number_of_postings_scanned += len(keyword_weight.statistics.postings)
+                    profile.number_of_texts_scored += len(text_index_to_value_score_map) - number_of_texts
+            elif len(keyword_weight.statistics.postings) < len(text_index_to_value_score_map):
+                for text_index, tdf in self.__get_tdfs(snapshot, keyword_weight, average_length_of_texts):
+                    if text_index in text_index_to_value_score_map:
+                        text_index_to_score_map[text_index] += weight * tdf
+                if profile is not None:
+                    profile.number_of_postings_scanned += len(keyword_weight.statistics.postings)
+            else:
+                text_indices = list(text_index_to_value_score_map.keys())
+                tdfs = self.__get_tdfs_for_text_indices(snapshot, keyword_weight, text_indices, average_length_of_texts)
+                for text_index, tdf in zip(text_indices, tdfs):
+                    if tdf > 0:
+                        text_index_to_score_map[text_index] += weight * tdf
+                if profile is not None:
+                    profile.number_of_postings_lookups += len(text_indices)
+
+        if profile is not None:
+            start = profile.finish_stage(STAGE_SCORING, start)
+        text_indices_with_scores = (
+            TextIndexAndScore(text_index, score_value +
+                              math.log(1 + text_index_to_category_score_map[text_index]))
+            for text_index, score_value in text_index_to_value_score_map.items()
+        )
+        result = heapq.nlargest(k, text_indices_with_scores, key=lambda x: (x.score, -x.text_index))
+        if profile is not None:
+            profile.finish_stage(STAGE_RANKING, start)
+        return result
+
+    def __find_threshold(self, text_index_to_value_score_map: Dict[int, float],
+                         text_index_to_category_score_map: Dict[int, float], k: int) -> float:
+        partial_scores = (score_value + math.log(1 + text_index_to_category_score_map[text_index])
+                          for text_index, score_value in text_index_to_value_score_map.items())
+        return heapq.nlargest(k, partial_scores)[-1]
+
+    def __get_tdfs(self, snapshot: TextIndex, keyword_weight: KeywordWeight, average_length_of_texts: float) \
+            -> Iterable[Tuple[int, float]]:
+        if keyword_weight.text_index_to_tdf_map is not None:
+            return keyword_weight.text_index_to_tdf_map.items()
+        return ((text_index, self.__compute_tdf_for_frequency(snapshot, keyword_weight, text_index, frequency,
+                                                              average_length_of_texts))
+                for text_index, frequency in keyword_weight.statistics.postings.items())
+
+    def __get_tdfs_for_text_indices(self, snapshot: TextIndex, keyword_weight: KeywordWeight,
+                                    text_indices: List[int], average_length_of_texts: float) -> List[float]:
+        if keyword_weight.text_index_to_tdf_map is not None:
+            return [keyword_weight.text_index_to_tdf_map.get(text_index, 0.0) for text_index in text_indices]
+        frequencies = keyword_weight.statistics.postings.get_frequencies(text_indices)
+        return [self.__compute_tdf_for_frequency(snapshot, keyword_weight, text_index, frequency,
+                                                 average_length_of_texts)
+                if frequency > 0 else 0.0
+                for text_index, frequency in zip(text_indices, frequencies)]
+
+    def __compute_tdf_for_frequency(self, snapshot: TextIndex, keyword_weight: KeywordWeight, text_index: int,
+                                    frequency: int, average_length_of_texts: float) -> float:
+        length_of_text_in_words = snapshot.get_word_length(text_index)
+        return self.__compute_tdf(frequency / keyword_weight.statistics.frequency_divisor,
+                                  length_of_text_in_words, average_length_of_texts)
+
+    def __compute_idf(self, total_number_of_texts: int, number_of_texts_containing_word: int) -> float:
         """
             About the BM25 score computation see https://en.wikipedia.org/wiki/Okapi_BM25
-        :param keyword: Element for which the part of the score is computed
-        :param text_index: Index of the text that is currently examined
-        :return: Score for the given keyword (input)
-        """
-        b = 0.75
-        k1 = 1.5
-        frequency_in_text = self.text_index.get_element_frequency(keyword, text_index)
-        total_number_of_texts = len(self.text_index.texts)
-        average_length_of_texts = self.text_index.average_text_length
-        length_of_text_in_words = self.text_index.get_word_length(text_index)
-        number_of_texts_containing_word = len(self.text_index.get_texts_for_element(keyword))
-
-        if keyword.is_category:
-            number_of_elements_of_category = \
-                self.text_index.get_number_of_category_elements(keyword.category_label)
-            frequency_in_text = frequency_in_text / number_of_elements_of_category
-
-        idf = math.log((total_number_of_texts - number_of_texts_containing_word + 0.5) / (
+        :param total_number_of_texts: Number of texts in the index
+        :param number_of_texts_containing_word: Document frequency of the keyword
+        :return: Inverse document frequency of the keyword
+        """
+        return math.log((total_number_of_texts - number_of_texts_containing_word + 0.5) / (
                     number_of_texts_containing_word + 0.5) + 1)
-        tdf = (frequency_in_text * (k1 + 1)) / (
-                    frequency_in_text + k1 * (1 - b + b * length_of_text_in_words / average_length_of_texts)
+
+    def __compute_tdf(self, frequency_in_text: float, length_of_text_in_words: int,
+                      average_length_of_texts: float) -> float:
+        return (frequency_in_text * (K1 + 1)) / (
+                    frequency_in_text + K1 * (1 - B + B * length_of_text_in_words / average_length_of_texts)
                 )
-        return idf * tdf
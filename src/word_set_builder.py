@@ -1,28 +1,58 @@
 """Builds sets of words using the embeddings from the english spacy model."""
 
-from typing import List, Dict, Set
-import json
+from typing import List, Dict, Set, Tuple, Iterable
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
 import hdbscan
 import sklearn.cluster
 from spacy.tokens import Token
 import numpy as np
-from numpy import dot
-from numpy.linalg import norm
 
 
+from src.batching import batched
 from src.word_tokenizer import WordTokenizer
+from src.embedding_store import EmbeddingStore
+from src.jsonl_reader import read_jsonl_texts, STS_FIELDS
+from src.word_set_manager import WordSetManager
+
+CLUSTERING_ALGORITHMS = ('auto', 'hdbscan', 'optics')
+DEFAULT_DISTANCE_THRESHOLD = 0.35
+
+logger = logging.getLogger(__name__)
 
 
 class WordSetBuilder:
     """
         To create the word sets necessary for the improved TFIDF text scoring, this
         class uses the word embeddings of an english spacy language model to
-        create the words sets automatically.
+        create the words sets automatically. The embeddings are taken from an
+        embedding store if one is given, so the language model is not needed.
     """
-    def __init__(self, tokenizer: WordTokenizer):
-        if tokenizer is None:
-            raise ValueError('tokenizer must be defined')
-        self.tokenizer = tokenizer
+    def __init__(self, tokenizer: WordTokenizer | None = None, clustering_algorithm: str = 'auto',
+                 n_jobs: int | None = None, block_size: int = 1024, embedding_store: EmbeddingStore | None = None):
+        """
+        :param tokenizer: Tokenizer providing the word embeddings
+        :param clustering_algorithm: 'auto' runs OPTICS and HDBSCAN on a precomputed distance
+        matrix and uses the result with more sets. 'hdbscan' and 'optics' run only the given
+        algorithm without a dense distance matrix, which is needed for large vocabularies
+        :param n_jobs: Number of parallel jobs used by the clustering, None for one job
+        :param block_size: Number of rows of the distance matrix computed at once
+        :param embedding_store: Store providing the word embeddings instead of the tokenizer
+        """
+        if tokenizer is None and embedding_store is None:
+            raise ValueError('tokenizer or embedding store must be defined')
+        if clustering_algorithm not in CLUSTERING_ALGORITHMS:
+            raise ValueError(f'clustering algorithm must be one of {", ".join(CLUSTERING_ALGORITHMS)}')
+        # texts are only split into words if the vectors come from the store
+        self.tokenizer = tokenizer if tokenizer is not None else WordTokenizer.get_shared(use_vectors=False)
+        self.embedding_store = embedding_store
+        self.clustering_algorithm = clustering_algorithm
+        self.n_jobs = n_jobs
+        self.block_size = block_size
+        # sums of the normalized vectors of the sets, kept for the next call of add_words_to_sets
+        self.centroid_word_set_manager: WordSetManager | None = None
+        self.label_to_vector_sum_map: Dict[str, Tuple[np.ndarray | None, Set[str]]] = {}
 
     def create_sets_from_sts_file(self, file_name: str, number_of_lines: int = 100) -> List[Set[str]]:
         """
@@ -31,69 +61,220 @@ class WordSetBuilder:
         :param number_of_lines: Number of lines that should be used for the set creation
         :return: Provides the found word sets
         """
-        tokens = []
-        with open(file_name, mode='r', encoding='utf-8') as f:
-            for _ in range(number_of_lines):
-                json_str = f.readline()
-                data = json.loads(json_str)
-                tokens.extend(self.tokenizer.tokenize(data['sentence1']))
-                tokens.extend(self.tokenizer.tokenize(data['sentence2']))
+        return self.create_sets_from_texts(read_jsonl_texts(file_name, STS_FIELDS, number_of_lines))
+
+    def create_sets_from_texts(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1,
+                               min_frequency: int = 1) -> List[Set[str]]:
+        """
+            Creates word sets from the words of a stream of texts, for example from
+            read_jsonl_texts. Only the word frequencies are kept while reading, the
+            vectors are looked up once per distinct word afterwards.
+        :param texts: Texts to take the words from
+        :param batch_size: Number of texts tokenized at once
+        :param n_process: Number of worker processes used for the tokenization
+        :param min_frequency: Minimum number of occurrences of a word to be used
+        :return: Provides the found word sets
+        """
+        word_counter = self.count_words(texts, batch_size, n_process)
+        return self.create_sets_from_word_list([word for word, frequency in word_counter.items()
+                                                if frequency >= min_frequency])
+
+    def count_words(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1) -> Counter:
+        """
+            Tokenizes the texts in batches and counts the words, punctuation is ignored.
+            With more than one process the batches are tokenized by worker processes
+            that split the texts without loading the word vectors.
+        :param texts: Texts to count the words of
+        :param batch_size: Number of texts tokenized at once
+        :param n_process: Number of worker processes used for the tokenization
+        :return: Counter with the frequency of every word
+        """
+        if batch_size < 1 or n_process < 1:
+            raise ValueError('batch size and number of processes must be at least 1')
+        word_counter = Counter()
+        if n_process == 1:
+            for doc in self.tokenizer.tokenize_many(texts, batch_size):
+                word_counter.update(token.text for token in doc if not token.is_punct)
+            return word_counter
 
-        word_to_token_map = {token.text: token for token in tokens if not token.is_punct}
-        filtered_tokens = {word_to_token_map[word] for word in word_to_token_map.keys()}
-        return self.create_sets_from_token_list(filtered_tokens)
+        tokenizer = WordTokenizer(self.tokenizer.model_name, use_vectors=False)
+        with ProcessPoolExecutor(max_workers=n_process, initializer=_initialize_worker,
+                                 initargs=(tokenizer,)) as executor:
+            # only a few batches are pending, so the texts can be streamed
+            pending = deque()
+            for batch in batched(texts, batch_size):
+                pending.append(executor.submit(_count_words, batch, batch_size))
+                if len(pending) >= 2 * n_process:
+                    word_counter.update(pending.popleft().result())
+            while pending:
+                word_counter.update(pending.popleft().result())
+        return word_counter
 
     def create_sets_from_word_list(self, word_list: List[str] | Set[str]) -> List[Set[str]]:
-        tokens = [self.tokenizer.tokenize(word) for word in word_list]
-        return self.create_sets_from_token_list(tokens)
+        words, vectors = self.__get_vectors(word_list)
+        return self.__create_sets(words, vectors)
+
+    def add_words_to_sets(self, word_set_manager: WordSetManager, word_list: List[str] | Set[str],
+                          distance_threshold: float = DEFAULT_DISTANCE_THRESHOLD) -> Dict[str, Set[str]]:
+        """
+            Adds new words to the word sets of the manager without clustering all words
+            again. Each word is added to the set with the nearest centroid if the cosine
+            distance to it is at most the threshold. Only the remaining words are clustered
+            and added as new sets. The labels of the existing sets do not change, so a text
+            index that combines the categories at query time sees the new words at once.
+            Words that are neither close to a set nor part of a new set are logged.
+        :param word_set_manager: Manager containing the existing word sets
+        :param word_list: New words, words that are already in a set are ignored
+        :param distance_threshold: Maximum cosine distance between a word and a set centroid
+        :return: Map from label to the words added to the set with this label
+        """
+        new_words = [word for word in word_list if len(word_set_manager.get_word_sets_for_element(word)) == 0]
+        words, vectors = self.__get_vectors(new_words)
+        label_to_words_map: Dict[str, Set[str]] = {}
+        if len(words) == 0:
+            return label_to_words_map
+
+        labels, centroids = self.__compute_centroids(word_set_manager)
+        remaining_rows = list(range(len(words)))
+        if len(labels) > 0:
+            remaining_rows = []
+            matrix = self.__normalize(vectors)
+            for start in range(0, len(matrix), self.block_size):
+                distances = 1 - matrix[start:start + self.block_size] @ centroids.T
+                nearest = np.argmin(distances, axis=1)
+                for offset, centroid in enumerate(nearest.tolist()):
+                    if distances[offset, centroid] <= distance_threshold:
+                        label_to_words_map.setdefault(labels[centroid], set()).add(words[start + offset])
+                    else:
+                        remaining_rows.append(start + offset)
+            for label, added_words in label_to_words_map.items():
+                word_set_manager.add(label, added_words)
+
+        remaining_words = {words[row] for row in remaining_rows}
+        # at least three words are needed to find a set that is not noise
+        if len(remaining_rows) >= 3:
+            word_sets = self.__create_sets([words[row] for row in remaining_rows], vectors[remaining_rows])
+            for label, word_set in zip(word_set_manager.add_sets(word_sets), word_sets):
+                label_to_words_map[label] = word_set
+                remaining_words -= word_set
+        if len(remaining_words) > 0:
+            logger.info('%d words are not added to a word set: %s', len(remaining_words),
+                        ', '.join(sorted(remaining_words)))
+        return label_to_words_map
 
     def create_sets_from_token_list(self, tokens: List[Token]) -> List[Set[str]]:
-        word_sets = self.__create_word_sets(tokens)
+        # extract embeddings created during tokenization
+        word_to_vector_map = {token.text: token.vector for token in tokens if token.has_vector}
+        return self.__create_sets(list(word_to_vector_map.keys()),
+                                  np.asarray(list(word_to_vector_map.values()), dtype=np.float32))
+
+    def __get_vectors(self, word_list: List[str] | Set[str]) -> Tuple[List[str], np.ndarray]:
+        if self.embedding_store is not None:
+            return self.embedding_store.get_vectors(word_list)
+        docs = [doc for doc in self.tokenizer.tokenize_many(word_list) if doc.has_vector]
+        word_to_vector_map = {doc.text: doc.vector for doc in docs}
+        return list(word_to_vector_map.keys()), np.asarray(list(word_to_vector_map.values()), dtype=np.float32)
+
+    def __compute_centroids(self, word_set_manager: WordSetManager) -> Tuple[List[str], np.ndarray]:
+        """
+            Computes the normalized mean of the normalized vectors of every word set.
+            The sum of the vectors of every set is kept, so only the vectors of the
+            words added to the sets since the last call are looked up.
+        :return: Labels of the sets with at least one vector and a matrix with their centroids as rows
+        """
+        if self.centroid_word_set_manager is not word_set_manager:
+            self.centroid_word_set_manager = word_set_manager
+            self.label_to_vector_sum_map = {}
+        label_to_new_words_map = {}
+        for label, word_set in word_set_manager.category_to_sets_map.items():
+            counted_words = self.label_to_vector_sum_map.get(label, (None, set()))[1]
+            if len(word_set.get_elements()) > len(counted_words):
+                label_to_new_words_map[label] = word_set.get_elements() - counted_words
+        if len(label_to_new_words_map) > 0:
+            words, vectors = self.__get_vectors(sorted(set().union(*label_to_new_words_map.values())))
+            word_to_row_map = {word: row for row, word in enumerate(words)}
+            matrix = self.__normalize(vectors)
+            for label, new_words in label_to_new_words_map.items():
+                vector_sum, counted_words = self.label_to_vector_sum_map.get(label, (None, set()))
+                rows = [word_to_row_map[word] for word in new_words if word in word_to_row_map]
+                if len(rows) > 0:
+                    new_vector_sum = matrix[rows].sum(axis=0)
+                    vector_sum = new_vector_sum if vector_sum is None else vector_sum + new_vector_sum
+                self.label_to_vector_sum_map[label] = (vector_sum, counted_words | new_words)
+
+        labels = []
+        centroids = []
+        for label in word_set_manager.category_to_sets_map.keys():
+            vector_sum = self.label_to_vector_sum_map.get(label, (None, set()))[0]
+            if vector_sum is not None:
+                labels.append(label)
+                centroids.append(vector_sum)
+        if len(centroids) == 0:
+            return labels, np.zeros((0, 0), dtype=np.float32)
+        # the normalized sum is the normalized mean
+        return labels, self.__normalize(centroids)
+
+    def __create_sets(self, words: List[str], vectors: np.ndarray) -> List[Set[str]]:
+        word_sets = self.__create_word_sets(words, vectors)
         result = [word_sets[label] for label in word_sets.keys() if label != -1]
-        uncategorized_set = word_sets[-1]
-        self.__improve_result(result, uncategorized_set)
+        self.__improve_result(result, words, vectors, word_sets.get(-1, set()))
         return result
 
-    def __improve_result(self, result: List[Set[str]], words: List[str]):
-        if words is None or len(words) < 3:
+    def __improve_result(self, result: List[Set[str]], words: List[str], vectors: np.ndarray,
+                         uncategorized_words: Set[str]):
+        """
+            Clusters the words without a set again. The vectors are taken from the rows
+            of the already known vectors, so nothing has to be tokenized again.
+        """
+        if uncategorized_words is None or len(uncategorized_words) < 3:
             return
-        tokens = [self.tokenizer.tokenize(word) for word in words]
-        word_sets = self.__create_word_sets(tokens)
+        rows = [row for row, word in enumerate(words) if word in uncategorized_words]
+        words = [words[row] for row in rows]
+        vectors = vectors[rows]
+        word_sets = self.__create_word_sets(words, vectors)
         for label in word_sets.keys():
             if label != -1:
                 result.append(word_sets[label])
         if -1 in word_sets:
             uncategorized_set = word_sets[-1]
             if len(uncategorized_set) < len(words):
-                self.__improve_result(result, uncategorized_set)
+                self.__improve_result(result, words, vectors, uncategorized_set)
         return
 
-    def __create_word_sets(self, words: List[Token]) -> Dict[str, Set[str]]:
+    def __create_word_sets(self, words: List[str], vectors: np.ndarray) -> Dict[str, Set[str]]:
         """
             Uses cluster algorithms to find a sets of words based on the word embedding
             similarity.
-        :param words: List of tokens containing the embedding vectors
+        :param words: List of distinct words
+        :param vectors: Matrix with the embedding vector of each word as row
         :return: Provides a dictionary with category label as key and the set of words as value
         """
-        # extract embeddings created during tokenization
-        word_to_vector_map = {word.text: word.vector for word in words if word.has_vector}
-        word_set = list(word_to_vector_map.keys())
-        token_vectors = [word_to_vector_map[word] for word in word_set if word in word_to_vector_map.keys()]
+        if self.clustering_algorithm == 'hdbscan':
+            # euclidean distances of normalized vectors are monotone in the cosine distance
+            hdb = hdbscan.HDBSCAN(metric='euclidean', algorithm='best', min_cluster_size=2,
+                                  core_dist_n_jobs=self.n_jobs if self.n_jobs is not None else 1)
+            hdb.fit(self.__normalize(vectors))
+            return self.__create_word_sets_from_clusters(hdb, words)
+        if self.clustering_algorithm == 'optics':
+            optics = sklearn.cluster.OPTICS(min_samples=2, metric='cosine', n_jobs=self.n_jobs)
+            optics.fit(self.__normalize(vectors))
+            return self.__create_word_sets_from_clusters(optics, words)
 
         # create clusters even for small word sets
-        optics = sklearn.cluster.OPTICS(min_samples=2)
-        optics.fit(token_vectors)
+        optics = sklearn.cluster.OPTICS(min_samples=2, n_jobs=self.n_jobs)
+        optics.fit(vectors)
 
         # create clusters
-        distance_matrix = self.__compute_distance_matrix(token_vectors)
-        hdb = hdbscan.HDBSCAN(metric='precomputed', algorithm='best', min_cluster_size=2)
+        distance_matrix = self.__compute_distance_matrix(vectors)
+        hdb = hdbscan.HDBSCAN(metric='precomputed', algorithm='best', min_cluster_size=2,
+                              core_dist_n_jobs=self.n_jobs if self.n_jobs is not None else 1)
         hdb.fit(distance_matrix)
 
         number_of_labels_optics = len(set(optics.labels_))
         number_of_labels_hdbscan = len(set(hdb.labels_))
         if number_of_labels_hdbscan > number_of_labels_optics:
-            return self.__create_word_sets_from_clusters(hdb, word_set)
-        return self.__create_word_sets_from_clusters(optics, word_set)
+            return self.__create_word_sets_from_clusters(hdb, words)
+        return self.__create_word_sets_from_clusters(optics, words)
 
     def __create_word_sets_from_clusters(self, hdb, word_set) -> Dict[str, Set[str]]:
         sets = {}
@@ -107,16 +288,39 @@ class WordSetBuilder:
             s.add(word_set[idx])
         return sets
 
-    def __compute_distance(self, x, y) -> float:
-        similarity = dot(x, y) / (norm(x) * norm(y))
-        return 1 - similarity
-
-    def __compute_distance_matrix(self, words):
-        result = []
-        for _, x in enumerate(words):
-            list = []
-            result.append(list)
-            for _, y in enumerate(words):
-                dist = self.__compute_distance(x, y)
-                list.append(dist)
-        return np.array(result)
+    def __normalize(self, vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def __compute_distance_matrix(self, vectors) -> np.ndarray:
+        """
+            Computes the cosine distances of all vectors. The vectors are normalized once
+            and the distances are computed block by block with matrix products.
+        :param vectors: Embedding vectors
+        :return: Matrix with the distance of every pair of vectors
+        """
+        matrix = self.__normalize(vectors)
+        result = np.empty((len(matrix), len(matrix)), dtype=np.float64)
+        for start in range(0, len(matrix), self.block_size):
+            end = min(start + self.block_size, len(matrix))
+            result[start:end] = 1 - matrix[start:end] @ matrix.T
+        np.maximum(result, 0, out=result)
+        np.fill_diagonal(result, 0)
+        return result
+
+
+_worker_tokenizer: WordTokenizer | None = None
+
+
+def _initialize_worker(tokenizer: WordTokenizer):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _count_words(texts: List[str], batch_size: int) -> Counter:
+    word_counter = Counter()
+    for doc in _worker_tokenizer.tokenize_many(texts, batch_size):
+        word_counter.update(token.text for token in doc if not token.is_punct)
+    return word_counter
@@ -28,29 +28,57 @@ class WordSetManager:
     def __init__(self):
         self.category_to_sets_map: Dict[str, WordSet] = {}
         self.element_to_word_sets_map: Dict[str, Set[WordSet]] = {}
+        # incremented on every change, so users can detect outdated data
+        self.version = 0
 
     def get_word_sets_for_element(self, word: str) -> Set[WordSet]:
         if word not in self.element_to_word_sets_map:
             return set()
         return self.element_to_word_sets_map.get(word)
 
-    def add_sets(self, word_sets: List[Set[str]]):
+    def add_sets(self, word_sets: List[Set[str]]) -> List[str]:
+        labels = []
         for word_set in word_sets:
             label = str(uuid.uuid4())
             self.add(label, word_set)
+            labels.append(label)
+        return labels
 
     def add(self, category: str, elements: Set[str]):
-        element_set = set(elements)
-        new_word_set = WordSet(category, element_set)
         if category in self.category_to_sets_map:
-            for element in elements:
-                self.category_to_sets_map.get(category).elements.update(element)
+            word_set = self.category_to_sets_map.get(category)
+            word_set.elements.update(elements)
         else:
-            self.category_to_sets_map[category] = new_word_set
+            word_set = WordSet(category, set(elements))
+            self.category_to_sets_map[category] = word_set
 
         for element in elements:
             if element in self.element_to_word_sets_map:
-                self.element_to_word_sets_map.get(element).add(new_word_set)
+                self.element_to_word_sets_map.get(element).add(word_set)
             else:
                 self.element_to_word_sets_map[element] = set()
-                self.element_to_word_sets_map[element].add(new_word_set)
\ No newline at end of file
+                self.element_to_word_sets_map[element].add(word_set)
+        self.version += 1
+
+    def save(self, file_name: str):
+        """
+            Writes the word sets as JSON file, the label of each set is kept.
+        :param file_name: Name of the file to write
+        """
+        data = {label: sorted(word_set.elements) for label, word_set in self.category_to_sets_map.items()}
+        with open(file_name, mode='w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    @staticmethod
+    def load(file_name: str) -> 'WordSetManager':
+        """
+            Reads the word sets written by save.
+        :param file_name: Name of the file to read
+        :return: Word set manager containing the word sets of the file
+        """
+        with open(file_name, mode='r', encoding='utf-8') as f:
+            data = json.load(f)
+        word_set_manager = WordSetManager()
+        for label, elements in data.items():
+            word_set_manager.add(label, set(elements))
+        return word_set_manager
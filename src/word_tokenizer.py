@@ -1,21 +1,103 @@
 """Split a text into tokens that also contain embeddings"""
 
-from typing import List
+from typing import List, Dict, Tuple, Iterable, Iterator
+from pathlib import Path
 import re
+import threading
 import spacy
+from spacy.language import Language
 from spacy.tokenizer import Tokenizer
 from spacy.tokens import Token
 
+DEFAULT_MODEL_NAME = 'en_core_web_lg'
+
 
 class WordTokenizer:
     """
         Convert strings into a list of tokens. It is used in several places so
         this class can be used to configure the tokenizer consistently.
+        The language model is loaded on first use and without its pipeline
+        components. Without vectors no model is loaded at all, which is enough
+        for indexing and searching texts, only the WordSetBuilder needs vectors.
     """
-    def __init__(self):
-        self.nlp = spacy.load('en_core_web_lg')
-        infix_re = re.compile(r'''[.\,\?\:\;\...\‘\’\`\“\”\"\'~]''')
-        self.tokenizer = Tokenizer(self.nlp.vocab, infix_finditer=infix_re.finditer)
+    __shared_instances: Dict[Tuple[str, bool], 'WordTokenizer'] = {}
+    __shared_instances_lock = threading.Lock()
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, use_vectors: bool = True, lazy: bool = True):
+        """
+        :param model_name: Name of the spaCy model providing the vocabulary and vectors
+        :param use_vectors: If False a blank english vocabulary without vectors is used
+        :param lazy: If True the model is loaded when the first text is tokenized
+        """
+        self.model_name = model_name
+        self.use_vectors = use_vectors
+        self.__nlp: Language | None = None
+        self.__tokenizer: Tokenizer | None = None
+        self.__lock = threading.Lock()
+        if not lazy:
+            self.__load()
+
+    @staticmethod
+    def get_shared(model_name: str = DEFAULT_MODEL_NAME, use_vectors: bool = True) -> 'WordTokenizer':
+        """
+            Provides one tokenizer per configuration for the whole process, so the
+            model is loaded only once.
+        """
+        key = (model_name, use_vectors)
+        with WordTokenizer.__shared_instances_lock:
+            if key not in WordTokenizer.__shared_instances:
+                WordTokenizer.__shared_instances[key] = WordTokenizer(model_name, use_vectors)
+            return WordTokenizer.__shared_instances[key]
+
+    @property
+    def nlp(self) -> Language:
+        self.__load()
+        return self.__nlp
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        self.__load()
+        return self.__tokenizer
+
+    def is_loaded(self) -> bool:
+        return self.__tokenizer is not None
 
     def tokenize(self, text: str) -> List[Token]:
         return self.tokenizer(text)
+
+    def tokenize_many(self, texts: Iterable[str], batch_size: int = 1000) -> Iterator[List[Token]]:
+        return self.tokenizer.pipe(texts, batch_size=batch_size)
+
+    def __getstate__(self):
+        # only the configuration is sent to other processes, they load the model themselves
+        return {'model_name': self.model_name, 'use_vectors': self.use_vectors}
+
+    def __setstate__(self, state):
+        self.__init__(state['model_name'], state['use_vectors'])
+
+    def __load(self):
+        if self.__tokenizer is not None:
+            return
+        with self.__lock:
+            if self.__tokenizer is not None:
+                return
+            if self.use_vectors:
+                # only the vocabulary with the vectors is used, the pipeline components are never run
+                nlp = spacy.load(self.model_name, exclude=get_component_names(self.model_name))
+            else:
+                nlp = spacy.blank('en')
+            infix_re = re.compile(r'''[.\,\?\:\;\...\‘\’\`\“\”\"\'~]''')
+            self.__nlp = nlp
+            self.__tokenizer = Tokenizer(nlp.vocab, infix_finditer=infix_re.finditer)
+
+
+def get_component_names(model_name: str) -> List[str]:
+    """
+        Reads the names of all pipeline components of a model from its meta data,
+        including the disabled components, without loading the model.
+    :param model_name: Name of an installed spaCy model package or path of a model directory
+    :return: Names of the components
+    """
+    path = Path(model_name) if Path(model_name).exists() else spacy.util.get_package_path(model_name)
+    meta = spacy.util.load_meta(path / 'meta.json')
+    return list(dict.fromkeys(meta.get('pipeline', []) + meta.get('components', [])))
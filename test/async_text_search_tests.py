@@ -0,0 +1,134 @@
+from typing import List
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+
+from src.async_text_search import AsyncTextSearch, create_process_executor
+from src.mapped_text_index import save_text_index
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+
+class SlowTextSearch:
+    """
+        Stands in for a TextSearch, every batch takes the given time and returns the
+        keywords as result or raises the given error.
+    """
+    def __init__(self, duration: float, error: Exception | None = None):
+        self.duration = duration
+        self.error = error
+        self.lock = threading.Lock()
+        self.number_of_running_batches = 0
+        self.max_number_of_running_batches = 0
+
+    def find_texts_batch(self, keywords_list: List[List[str]], k: int | None) -> List[List[str]]:
+        with self.lock:
+            self.number_of_running_batches += 1
+            self.max_number_of_running_batches = max(self.max_number_of_running_batches,
+                                                     self.number_of_running_batches)
+        time.sleep(self.duration)
+        with self.lock:
+            self.number_of_running_batches -= 1
+        if self.error is not None:
+            raise self.error
+        return [list(keywords) for keywords in keywords_list]
+
+
+class AsyncTextSearchTestCase(unittest.TestCase):
+    texts = [
+        'the man is in the garden',
+        'the boy gets angry',
+        'the women is in the kitchen'
+    ]
+
+    def test_concurrent_queries_are_batched_and_coalesced(self):
+        text_search = TextSearch(self.__create_text_index())
+        keywords_list = [["grandfather", "in"], ["kitchen"], ["grandfather", "in"], ["boy"]]
+
+        async def search():
+            async_text_search = AsyncTextSearch(text_search, batch_delay=0.01)
+            results = await asyncio.gather(*[async_text_search.find_texts(keywords, k=2)
+                                             for keywords in keywords_list])
+            await async_text_search.close()
+            return results, async_text_search.get_statistics()
+
+        results, statistics = asyncio.run(search())
+        self.assertEqual(results, [text_search.find_texts(keywords, k=2) for keywords in keywords_list])
+        self.assertEqual(statistics['number_of_coalesced_queries'], 1)
+        self.assertEqual(statistics['number_of_batches'], 1)
+        self.assertEqual(statistics['number_of_pending_queries'], 0)
+
+    def test_timeout_does_not_cancel_coalesced_query(self):
+        async def search():
+            async_text_search = AsyncTextSearch(SlowTextSearch(0.2), batch_delay=0)
+            waiting_query = asyncio.ensure_future(async_text_search.find_texts(["man"]))
+            with self.assertRaises(asyncio.TimeoutError):
+                await async_text_search.find_texts(["man"], timeout=0.01)
+            result = await waiting_query
+            await async_text_search.close()
+            return result
+
+        self.assertEqual(asyncio.run(search()), ["man"])
+
+    def test_pending_queries_are_limited(self):
+        text_search = SlowTextSearch(0.05)
+
+        async def search():
+            async_text_search = AsyncTextSearch(text_search, batch_delay=0, max_pending_queries=1)
+            results = await asyncio.gather(*[async_text_search.find_texts([keyword]) for keyword in ["a", "b", "c"]])
+            await async_text_search.close()
+            return results, async_text_search.get_statistics()
+
+        results, statistics = asyncio.run(search())
+        self.assertEqual(results, [["a"], ["b"], ["c"]])
+        self.assertEqual(statistics['number_of_batches'], 3)
+        self.assertEqual(text_search.max_number_of_running_batches, 1)
+
+    def test_error_is_raised_for_all_coalesced_queries(self):
+        async def search():
+            async_text_search = AsyncTextSearch(SlowTextSearch(0.01, RuntimeError('search failed')), batch_delay=0.01)
+            results = await asyncio.gather(async_text_search.find_texts(["man"]),
+                                           async_text_search.find_texts(["man"]), return_exceptions=True)
+            await async_text_search.close()
+            return results, async_text_search.get_statistics()
+
+        results, statistics = asyncio.run(search())
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(statistics['number_of_coalesced_queries'], 1)
+        self.assertEqual(statistics['number_of_pending_queries'], 0)
+
+    def test_process_executor(self):
+        text_index = self.__create_text_index()
+        keywords_list = [["man", "garden"], ["kitchen"]]
+        with tempfile.TemporaryDirectory() as directory:
+            save_text_index(text_index, directory)
+
+            async def search():
+                async_text_search = AsyncTextSearch(None, create_process_executor(directory, 1))
+                results = await asyncio.gather(*[async_text_search.find_texts(keywords, k=2)
+                                                 for keywords in keywords_list])
+                await async_text_search.close()
+                return results
+
+            results = asyncio.run(search())
+        text_search = TextSearch(text_index)
+        self.assertEqual(results, [text_search.find_texts(keywords, k=2) for keywords in keywords_list])
+
+    def test_text_search_or_executor_must_be_defined(self):
+        self.assertRaises(ValueError, AsyncTextSearch, None)
+
+    def __create_text_index(self) -> TextIndex:
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        text_index = TextIndex(word_sets_manager, WordTokenizer())
+        for text in self.texts:
+            text_index.add(text)
+        return text_index
+
+
+if __name__ == '__main__':
+    unittest.main()
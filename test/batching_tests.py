@@ -0,0 +1,14 @@
+import unittest
+
+from src.batching import batched
+
+
+class BatchingTestCase(unittest.TestCase):
+    def test_batched(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched(iter(['a', 'b']), 2)), [['a', 'b']])
+        self.assertEqual(list(batched([], 3)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
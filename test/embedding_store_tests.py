@@ -0,0 +1,37 @@
+import tempfile
+import unittest
+
+import numpy as np
+from src.embedding_store import EmbeddingStore, create_embedding_store
+from src.word_set_builder import WordSetBuilder
+from src.word_tokenizer import WordTokenizer
+
+
+class EmbeddingStoreTestCase(unittest.TestCase):
+    def test_create_and_load_store(self):
+        tokenizer = WordTokenizer()
+        with tempfile.TemporaryDirectory() as directory:
+            create_embedding_store(directory, tokenizer, ['man', 'garden', 'man', 'qqqzzz'])
+            embedding_store = EmbeddingStore(directory)
+
+            self.assertEqual(len(embedding_store), 2)
+            self.assertFalse('qqqzzz' in embedding_store)
+            self.assertIsNone(embedding_store.get_vector('qqqzzz'))
+            self.assertTrue(np.array_equal(embedding_store.get_vector('garden'), tokenizer.tokenize('garden')[0].vector))
+            words, vectors = embedding_store.get_vectors(['garden', 'qqqzzz', 'man'])
+            self.assertEqual(words, ['garden', 'man'])
+            self.assertEqual(vectors.shape, (2, embedding_store.get_dimension()))
+
+    def test_word_sets_from_store(self):
+        words = ['man', 'boy', 'women', 'girl', 'garden', 'kitchen', 'house', 'run', 'went', 'go', 'angry', 'happy']
+        tokenizer = WordTokenizer()
+        with tempfile.TemporaryDirectory() as directory:
+            embedding_store = create_embedding_store(directory, tokenizer, words)
+
+            word_sets = WordSetBuilder(embedding_store=embedding_store).create_sets_from_word_list(words)
+
+            self.assertEqual(word_sets, WordSetBuilder(tokenizer).create_sets_from_word_list(words))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+
+from src.jsonl_reader import read_jsonl_texts
+
+
+class JsonlReaderTestCase(unittest.TestCase):
+    def test_read_texts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'texts.jsonl')
+            with open(file_name, mode='w', encoding='utf-8') as f:
+                f.write('{"sentence1": "the man", "sentence2": "the boy", "score": 1.0}\n')
+                f.write('\n')
+                f.write('{"sentence1": "the garden", "title": "kitchen"}\n')
+
+            self.assertEqual(list(read_jsonl_texts(file_name)), ['the man', 'the boy', 'the garden'])
+            self.assertEqual(list(read_jsonl_texts(file_name, ['title', 'score'])), ['kitchen'])
+            self.assertEqual(list(read_jsonl_texts(file_name, number_of_lines=1)), ['the man', 'the boy'])
+            self.assertEqual(len(list(read_jsonl_texts(file_name, number_of_lines=100))), 3)
+
+    def test_lines_that_are_no_objects(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'texts.jsonl')
+            for line in ['["the man"]', '"the man"', '{"sentence1": ']:
+                with open(file_name, mode='w', encoding='utf-8') as f:
+                    f.write('{"sentence1": "the boy"}\n')
+                    f.write(line + '\n')
+
+                with self.assertRaisesRegex(ValueError, 'line 2'):
+                    list(read_jsonl_texts(file_name))
+
+
+if __name__ == '__main__':
+    unittest.main()
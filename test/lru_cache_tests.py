@@ -0,0 +1,39 @@
+import unittest
+
+from src.lru_cache import LRUCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.clear()
+
+        self.assertFalse('a' in cache)
+
+    def test_invalidate_clears_entries_of_old_version(self):
+        cache = LRUCache(2)
+        cache.invalidate(1)
+        cache.put('a', 1)
+        cache.invalidate(1)
+        self.assertTrue('a' in cache)
+        cache.invalidate(2)
+        self.assertFalse('a' in cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
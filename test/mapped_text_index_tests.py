@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from src.mapped_text_index import save_text_index, load_text_index
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+
+class MappedTextIndexTestCase(unittest.TestCase):
+    def test_save_and_load_text_index(self):
+        texts = [
+            'the man is in the garden',
+            'the boy gets angry',
+            'the women is in the kitchen'
+        ]
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        tokenizer = WordTokenizer()
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        for text in texts:
+            text_index.add(text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            index_directory = os.path.join(directory, 'index')
+            save_text_index(text_index, index_directory)
+            mapped_text_index = load_text_index(index_directory, tokenizer)
+
+            self.assertEqual(list(mapped_text_index.texts), texts)
+            self.assertEqual(mapped_text_index.get_number_of_texts(), text_index.get_number_of_texts())
+            self.assertAlmostEqual(mapped_text_index.average_text_length, text_index.average_text_length)
+            for element in text_index.get_elements():
+                self.assertEqual(dict(mapped_text_index.get_postings(element)), text_index.get_postings(element))
+            for keywords in [["grandfather", "in"], ["kitchen"]]:
+                self.assertEqual(TextSearch(mapped_text_index).find_texts(keywords),
+                                 TextSearch(text_index).find_texts(keywords))
+
+    def test_save_text_index_with_deleted_texts(self):
+        tokenizer = WordTokenizer()
+        text_index = TextIndex(WordSetManager(), tokenizer)
+        text_index.add_many(['the man is in the garden', 'the boy gets angry', 'the women is in the kitchen',
+                             'the grandfather went to the garden'])
+        text_index.delete(3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            save_text_index(text_index, directory)
+            mapped_text_index = load_text_index(directory, tokenizer)
+
+            self.assertEqual(mapped_text_index.total_text_length, text_index.total_text_length)
+            self.assertAlmostEqual(mapped_text_index.total_text_length / mapped_text_index.get_number_of_live_texts(),
+                                   mapped_text_index.get_average_text_length())
+            self.assertEqual(mapped_text_index.get_word_length(3), 0)
+            self.assertEqual(mapped_text_index.get_word_length(1), text_index.get_word_length(1))
+            for element in text_index.get_elements():
+                self.assertEqual(dict(mapped_text_index.get_postings(element, mapped_text_index.get_deleted_texts())),
+                                 dict(text_index.get_postings(element).items()))
+
+    def test_mapped_text_index_is_read_only(self):
+        tokenizer = WordTokenizer()
+        text_index = TextIndex(WordSetManager(), tokenizer)
+        text_index.add('the boy gets angry')
+
+        with tempfile.TemporaryDirectory() as directory:
+            save_text_index(text_index, directory)
+            mapped_text_index = load_text_index(directory, tokenizer)
+
+            self.assertRaises(ValueError, mapped_text_index.add, 'the man is in the garden')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from src.postings import Postings, CompressedPostings, LivePostings
+
+
+class PostingsTestCase(unittest.TestCase):
+    def test_append_and_get_frequency(self):
+        postings = Postings()
+        postings.append(1, 2)
+        postings.append(5, 1)
+        postings.extend([7, 9], [4, 1])
+
+        self.assertEqual(len(postings), 4)
+        self.assertEqual(postings.get(5), 1)
+        self.assertEqual(postings.get(6, 0), 0)
+        self.assertEqual(postings.max_frequency, 4)
+        self.assertEqual(list(postings.items()), [(1, 2), (5, 1), (7, 4), (9, 1)])
+
+    def test_append_requires_increasing_text_indices(self):
+        postings = Postings()
+        postings.append(3, 1)
+
+        self.assertRaises(ValueError, postings.append, 3, 1)
+        self.assertRaises(ValueError, postings.extend, [2], [1])
+
+    def test_compressed_postings(self):
+        text_indices = [idx * 3 for idx in range(300)]
+        frequencies = [idx % 5 + 1 for idx in range(300)]
+        postings = Postings()
+        postings.extend(text_indices, frequencies)
+        compressed_postings = CompressedPostings(block_size=128)
+        compressed_postings.extend(text_indices, frequencies)
+
+        self.assertEqual(len(compressed_postings), 300)
+        self.assertEqual(list(compressed_postings.items()), list(postings.items()))
+        self.assertEqual(compressed_postings.max_frequency, 5)
+        self.assertEqual(compressed_postings.get(3), 2)
+        self.assertEqual(compressed_postings.get(4, 0), 0)
+        self.assertEqual(compressed_postings.get(897), postings.get(897))
+        lookups = [0, 1, 384, 600, 897, 5000]
+        self.assertEqual(compressed_postings.get_frequencies(lookups), postings.get_frequencies(lookups))
+        self.assertTrue(compressed_postings.get_size_in_bytes() < postings.get_size_in_bytes())
+        for start, end in [(0, 10), (380, 900), (895, 5000), (10, 10)]:
+            self.assertEqual(list(compressed_postings.get_range(start, end).items()),
+                             list(postings.get_range(start, end).items()))
+
+    def test_live_postings_skip_deleted_texts(self):
+        postings = Postings()
+        postings.extend([1, 4, 6, 9], [2, 1, 3, 1])
+        live_postings = LivePostings(postings, {4, 6, 7}, 2)
+
+        self.assertEqual(len(live_postings), 2)
+        self.assertEqual(dict(live_postings.items()), {1: 2, 9: 1})
+        self.assertEqual(list(live_postings.keys()), [1, 9])
+        self.assertEqual(list(live_postings.values()), [2, 1])
+        self.assertNotIn(4, live_postings)
+        self.assertIsNone(live_postings.get(6))
+        self.assertEqual(live_postings.get_frequencies([1, 4, 9]), [2, 0, 1])
+        self.assertEqual(dict(live_postings.get_range(0, 9).items()), {1: 2})
+        self.assertEqual(len(LivePostings(postings, {4, 6, 7})), 2)
+        self.assertRaises(KeyError, live_postings.__getitem__, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+
+from src.async_text_search import AsyncTextSearch
+from src.search_server import handle_request
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+
+class FailingTextSearch:
+    def find_texts_batch(self, keywords_list, k):
+        raise RuntimeError('search failed')
+
+
+class SearchServerTestCase(unittest.TestCase):
+    texts = [
+        'the man is in the garden',
+        'the boy gets angry',
+        'the women is in the kitchen'
+    ]
+
+    def test_handle_request(self):
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        text_index = TextIndex(word_sets_manager, WordTokenizer())
+        text_index.add_many(self.texts)
+        text_search = TextSearch(text_index)
+
+        async def request(*request_lines):
+            async_text_search = AsyncTextSearch(text_search)
+            responses = [await handle_request(async_text_search, request_line.split())
+                         for request_line in request_lines]
+            await async_text_search.close()
+            return responses
+
+        search, statistics, bad_k, zero_k, unknown_path, post = asyncio.run(request(
+            'GET /search?q=man+garden&k=1 HTTP/1.1', 'GET /statistics HTTP/1.1', 'GET /search?q=man&k=x HTTP/1.1',
+            'GET /search?q=man&k=0 HTTP/1.1', 'GET /find?q=man HTTP/1.1', 'POST /search HTTP/1.1'))
+        self.assertEqual(search, ('200 OK', {'texts': text_search.find_texts(["man", "garden"], k=1)}))
+        self.assertEqual(statistics[0], '200 OK')
+        self.assertEqual(statistics[1]['number_of_queries'], 1)
+        self.assertEqual(bad_k[0], '400 Bad Request')
+        self.assertEqual(zero_k[0], '400 Bad Request')
+        self.assertEqual(unknown_path[0], '404 Not Found')
+        self.assertEqual(post[0], '405 Method Not Allowed')
+
+    def test_failed_query_returns_internal_server_error(self):
+        async def request():
+            async_text_search = AsyncTextSearch(FailingTextSearch())
+            response = await handle_request(async_text_search, ['GET', '/search?q=man'])
+            await async_text_search.close()
+            return response
+
+        with self.assertLogs('src.search_server', level='ERROR'):
+            status, body = asyncio.run(request())
+        self.assertEqual(status, '500 Internal Server Error')
+        self.assertIn('error', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
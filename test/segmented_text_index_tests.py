@@ -0,0 +1,145 @@
+import sys
+import threading
+import unittest
+from unittest import mock
+
+from src.segmented_text_index import SegmentedTextIndex
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+
+class SegmentedTextIndexTestCase(unittest.TestCase):
+    texts = [
+        'the women is in the kitchen',
+        'the boy is in the garden',
+        'the man is in the garden',
+        'the grandfather went to the garden',
+        'the girl runs to the kitchen',
+        'the boy gets angry'
+    ]
+
+    def test_find_texts_like_text_index(self):
+        word_set_manager = self.__create_word_set_manager()
+        tokenizer = WordTokenizer()
+        text_index = TextIndex(word_set_manager, tokenizer)
+        segmented_text_index = SegmentedTextIndex(word_set_manager, tokenizer, segment_size=1, merge_factor=2)
+        for text in self.texts:
+            text_index.add(text)
+            segmented_text_index.add(text)
+        segmented_text_index.wait_for_merges()
+        segmented_text_index.close()
+
+        self.assertTrue(segmented_text_index.get_number_of_segments() < len(self.texts))
+        text_search = TextSearch(text_index)
+        segmented_text_search = TextSearch(segmented_text_index)
+        for keywords in [["man", "garden"], ["grandfather", "in"], ["kitchen"], ["unknown"]]:
+            self.assertEqual(segmented_text_search.find_texts(keywords), text_search.find_texts(keywords))
+            self.assertEqual(segmented_text_search.find_texts(keywords, k=2), text_search.find_texts(keywords, k=2))
+
+    def test_snapshot_is_not_changed_by_adds(self):
+        segmented_text_index = SegmentedTextIndex(self.__create_word_set_manager(), WordTokenizer(), segment_size=2,
+                                                  merge_in_background=False)
+        segmented_text_index.add_many(self.texts[:3])
+
+        snapshot = segmented_text_index.snapshot()
+        adding_thread = threading.Thread(target=segmented_text_index.add_many, args=(self.texts[3:],))
+        adding_thread.start()
+        adding_thread.join()
+
+        self.assertEqual(snapshot.get_number_of_texts(), 3)
+        self.assertEqual(list(snapshot.texts), self.texts[:3])
+        self.assertEqual(TextSearch(snapshot).find_texts(["kitchen"], k=5), [self.texts[0]])
+        self.assertEqual(TextSearch(segmented_text_index).find_texts(["kitchen"], k=5), [self.texts[0], self.texts[4]])
+
+    def test_search_while_texts_are_added(self):
+        texts = [f'the {name} is in the {place} number{idx}'
+                 for idx, (name, place) in enumerate([('man', 'garden'), ('boy', 'kitchen')] * 200)]
+        for index_categories in [True, False]:
+            segmented_text_index = SegmentedTextIndex(self.__create_word_set_manager(), WordTokenizer(),
+                                                      segment_size=1000, index_categories=index_categories)
+            adding_thread = threading.Thread(target=lambda: [segmented_text_index.add(text) for text in texts])
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            try:
+                adding_thread.start()
+                while adding_thread.is_alive():
+                    snapshot = segmented_text_index.snapshot()
+                    number_of_texts = snapshot.get_number_of_texts()
+                    found_texts = TextSearch(snapshot).find_texts(["grandfather", "garden"], k=5)
+                    self.assertTrue(set(found_texts) <= set(texts[:number_of_texts]))
+                    self.assertEqual(len(snapshot.get_postings(snapshot.create_elements_for_words(["man"])[0])),
+                                     (number_of_texts + 1) // 2)
+                    # the words of the next texts may be added to the index at this moment
+                    number_elements = [snapshot.create_elements_for_words([f'number{idx}'])[0]
+                                       for idx in range(number_of_texts, number_of_texts + 10)]
+                    for _ in range(50):
+                        for number_element in number_elements:
+                            self.assertEqual(len(snapshot.get_postings(number_element)), 0)
+            finally:
+                sys.setswitchinterval(switch_interval)
+                adding_thread.join()
+                segmented_text_index.close()
+            self.assertEqual(TextSearch(segmented_text_index).find_texts(["garden", "number6"], k=1), [texts[6]])
+
+    def test_failed_merge_is_raised(self):
+        segmented_text_index = SegmentedTextIndex(self.__create_word_set_manager(), WordTokenizer(), segment_size=1,
+                                                  merge_factor=2)
+        with mock.patch.object(TextIndex, 'create_compacted_text_index', side_effect=MemoryError('no memory')):
+            for text in self.texts[:2]:
+                segmented_text_index.add(text)
+            with self.assertRaises(RuntimeError) as context:
+                segmented_text_index.wait_for_merges()
+        self.assertIsInstance(context.exception.__cause__, MemoryError)
+        self.assertEqual(TextSearch(segmented_text_index).find_texts(["kitchen"], k=5), [self.texts[0]])
+        self.assertRaises(RuntimeError, segmented_text_index.close)
+
+    def test_snapshot_is_not_changed_by_deletes(self):
+        segmented_text_index = SegmentedTextIndex(self.__create_word_set_manager(), WordTokenizer(), segment_size=2,
+                                                  merge_in_background=False)
+        segmented_text_index.add_many(self.texts)
+        segmented_text_index.delete(5)
+        snapshot = segmented_text_index.snapshot()
+        texts = TextSearch(snapshot).find_texts(["boy", "garden"])
+
+        segmented_text_index.delete(1)
+        segmented_text_index.delete(2)
+
+        self.assertEqual(snapshot.get_number_of_live_texts(), 5)
+        self.assertEqual(snapshot.get_minimum_text_length(), 6)
+        self.assertTrue(snapshot.contains(1))
+        self.assertEqual(list(snapshot.get_text_indices()), [0, 1, 2, 3, 4])
+        self.assertEqual(TextSearch(snapshot).find_texts(["boy", "garden"]), texts)
+        self.assertNotIn(self.texts[1], TextSearch(segmented_text_index).find_texts(["boy", "garden"]))
+
+    def test_delete_texts_in_segments(self):
+        word_set_manager = self.__create_word_set_manager()
+        tokenizer = WordTokenizer()
+        text_index = TextIndex(word_set_manager, tokenizer)
+        text_index.add_many(self.texts)
+        segmented_text_index = SegmentedTextIndex(word_set_manager, tokenizer, segment_size=2, merge_factor=2,
+                                                  merge_in_background=False)
+        segmented_text_index.add_many(self.texts)
+
+        for idx in [1, 4]:
+            text_index.delete(idx)
+            segmented_text_index.delete(idx)
+        self.assertEqual(segmented_text_index.update(2, 'the man is in the kitchen'),
+                         text_index.update(2, 'the man is in the kitchen'))
+
+        text_search = TextSearch(text_index)
+        segmented_text_search = TextSearch(segmented_text_index)
+        for keywords in [["man", "garden"], ["boy"], ["kitchen"]]:
+            self.assertEqual(segmented_text_search.find_texts(keywords), text_search.find_texts(keywords))
+            self.assertEqual(segmented_text_search.find_texts(keywords, k=2), text_search.find_texts(keywords, k=2))
+
+    def __create_word_set_manager(self) -> WordSetManager:
+        word_set_manager = WordSetManager()
+        word_set_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        word_set_manager.add('person_moving', {'go', 'went', 'run'})
+        return word_set_manager
+
+
+if __name__ == '__main__':
+    unittest.main()
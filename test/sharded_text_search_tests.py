@@ -0,0 +1,44 @@
+import tempfile
+import unittest
+
+from src.mapped_text_index import save_text_index
+from src.sharded_text_search import ShardedTextSearch
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+
+class ShardedTextSearchTestCase(unittest.TestCase):
+    def test_sharded_search_finds_same_texts(self):
+        texts = [
+            'the man is in the garden',
+            'the boy gets angry',
+            'the women is in the kitchen',
+            'the grandfather is in the garden',
+            'a boy and a man are in the kitchen'
+        ]
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        tokenizer = WordTokenizer()
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        for text in texts:
+            text_index.add(text)
+        text_search = TextSearch(text_index)
+
+        with tempfile.TemporaryDirectory() as directory:
+            save_text_index(text_index, directory)
+            with ShardedTextSearch(directory, 2, tokenizer) as sharded_text_search:
+                self.assertEqual(len(sharded_text_search.text_index_ranges), 2)
+                for keywords in [['grandfather', 'in'], ['kitchen'], ['boy', 'garden']]:
+                    self.assertEqual(sharded_text_search.find_texts(keywords), text_search.find_texts(keywords))
+                    self.assertEqual(sharded_text_search.find_texts(keywords, k=2),
+                                     text_search.find_texts(keywords, k=2))
+
+    def test_number_of_shards_must_be_positive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertRaises(ValueError, ShardedTextSearch, directory, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
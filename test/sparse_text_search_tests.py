@@ -0,0 +1,67 @@
+import unittest
+
+from typing import List
+from src.text_index import TextIndex
+from src.text_search import TextSearch
+from src.sparse_text_search import SparseTextSearch
+from src.word_tokenizer import WordTokenizer
+from src.word_set_manager import WordSetManager
+
+
+class SparseTextSearchTestCase(unittest.TestCase):
+
+    def test_find_texts_like_text_search(self):
+        texts = [
+            'the women is in the kitchen',
+            'the boy is in the garden',
+            'the man is in the garden',
+            'the grandfather went to the garden'
+        ]
+        text_index = self.__create_text_index(texts)
+
+        text_search = TextSearch(text_index)
+        sparse_text_search = SparseTextSearch(text_index)
+
+        for keywords in [["man", "garden"], ["grandfather", "in"], ["kitchen"], ["unknown"]]:
+            self.assertEqual(sparse_text_search.find_texts(keywords), text_search.find_texts(keywords))
+            self.assertEqual(sparse_text_search.find_texts(keywords, k=2), text_search.find_texts(keywords, k=2))
+
+    def test_find_texts_batch(self):
+        texts = [
+            'the women is in the kitchen',
+            'the boy is in the garden',
+            'the man is in the garden'
+        ]
+        keywords_list = [["man", "garden"], ["grandfather", "in"], ["kitchen", "kitchen"], ["unknown"]]
+        text_index = self.__create_text_index(texts)
+
+        sparse_text_search = SparseTextSearch(text_index)
+        results = sparse_text_search.find_texts_batch(keywords_list, k=2)
+
+        self.assertEqual(results, [sparse_text_search.find_texts(keywords, k=2) for keywords in keywords_list])
+
+    def test_compute_scores(self):
+        texts = [
+            'the man is in the garden',
+            'the women is in the kitchen'
+        ]
+        text_index = self.__create_text_index(texts)
+
+        sparse_text_search = SparseTextSearch(text_index)
+        scores = sparse_text_search.compute_scores(["boy"])
+
+        self.assertTrue(scores[0] > 0)
+        self.assertEqual(scores[1], 0)
+
+    def __create_text_index(self, texts: List[str]) -> TextIndex:
+        word_set_manager = WordSetManager()
+        word_set_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        word_set_manager.add('person_moving', {'go', 'went', 'run'})
+        text_index = TextIndex(word_set_manager, WordTokenizer())
+        for text in texts:
+            text_index.add(text)
+        return text_index
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,30 @@
+import threading
 import unittest
 
 from src.text_index import TextIndex
+from src.text_search import TextSearch
 from src.word_tokenizer import WordTokenizer
 from src.word_set_manager import WordSetManager
 
 
+class PausingDict(dict):
+    """
+        Dictionary whose items pause after the first item until the test continues,
+        to look at an index in the middle of a merge.
+    """
+    def __init__(self, items: dict):
+        super().__init__(items)
+        self.paused = threading.Event()
+        self.resumed = threading.Event()
+
+    def items(self):
+        for position, item in enumerate(super().items()):
+            if position == 1:
+                self.paused.set()
+                self.resumed.wait()
+            yield item
+
+
 class TextIndexTestCase(unittest.TestCase):
     def test_TextIndex_without_word_sets(self):
         text1 = 'the man is in the garden'
@@ -34,6 +54,179 @@ class TextIndexTestCase(unittest.TestCase):
         number_of_category_elements = text_index.get_number_of_category_elements('noun')
         self.assertTrue(number_of_category_elements > 0)
 
+    def test_get_element_frequency(self):
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy', 'garden'})
+        tokenizer = WordTokenizer()
+
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        text_index.add('the man is in the garden')
+        text_index.add('the boy gets angry')
+
+        the = text_index.create_elements_for_words(['the'])[0]
+        noun = text_index.create_elements_for_words(['boy'])[1]
+        self.assertEqual(text_index.get_element_frequency(the, 0), 2)
+        self.assertEqual(text_index.get_element_frequency(noun, 0), 2)
+        self.assertEqual(text_index.get_element_frequency(noun, 1), 1)
+        self.assertEqual(text_index.get_texts_for_element(noun), ['the man is in the garden', 'the boy gets angry'])
+        self.assertEqual(text_index.get_word_length(0), 6)
+
+    def test_compressed_postings(self):
+        texts = ['the man is in the garden', 'the boy gets angry', 'the man is in the kitchen']
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy', 'garden'})
+        tokenizer = WordTokenizer()
+
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        compressed_text_index = TextIndex(word_sets_manager, tokenizer, compress_postings=True)
+        for text in texts:
+            text_index.add(text)
+            compressed_text_index.add(text)
+
+        for element in text_index.get_elements():
+            self.assertEqual(compressed_text_index.get_postings(element), text_index.get_postings(element))
+        statistics = compressed_text_index.get_postings_statistics()
+        self.assertEqual(statistics.number_of_terms, len(list(text_index.get_elements())))
+        self.assertEqual(statistics.number_of_postings, text_index.get_postings_statistics().number_of_postings)
+        self.assertTrue(statistics.bytes_per_posting > 0)
+
+    def test_categories_combined_at_query_time(self):
+        texts = ['the man is in the garden', 'the boy gets angry', 'the women is in the kitchen']
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy', 'garden'})
+        tokenizer = WordTokenizer()
+
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        word_text_index = TextIndex(word_sets_manager, tokenizer, index_categories=False)
+        for text in texts:
+            text_index.add(text)
+            word_text_index.add(text)
+
+        noun = text_index.create_elements_for_words(['boy'])[1]
+        self.assertEqual(word_text_index.get_postings(noun), text_index.get_postings(noun))
+        self.assertTrue(word_text_index.get_postings_statistics().number_of_postings <
+                        text_index.get_postings_statistics().number_of_postings)
+
+        word_sets_manager.add('noun', {'kitchen'})
+        self.assertEqual(list(word_text_index.get_postings(noun).keys()), [0, 1, 2])
+
+    def test_add_many_texts(self):
+        texts = ['the man is in the garden', 'the boy gets angry', None, 'the man is in the kitchen']
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy', 'garden'})
+        tokenizer = WordTokenizer()
+
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        for text in texts:
+            text_index.add(text)
+        bulk_text_index = TextIndex(word_sets_manager, tokenizer)
+        bulk_text_index.add_many(texts, batch_size=2)
+
+        self.assertEqual(bulk_text_index.texts, text_index.texts)
+        self.assertAlmostEqual(bulk_text_index.average_text_length, text_index.average_text_length)
+        for element in text_index.get_elements():
+            self.assertEqual(bulk_text_index.get_postings(element), text_index.get_postings(element))
+
+    def test_add_many_texts_in_processes(self):
+        texts = ['the man is in the garden', 'the boy gets angry', None, 'the man is in the kitchen',
+                 'the grandfather went to the garden', 'the girl runs to the kitchen', 'the boy is in the garden']
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy', 'garden'})
+        tokenizer = WordTokenizer()
+
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        text_index.add_many(texts, batch_size=2, n_process=1)
+        process_text_index = TextIndex(word_sets_manager, tokenizer)
+        process_text_index.add_many(texts, batch_size=2, n_process=2)
+
+        self.assertEqual(process_text_index.texts, text_index.texts)
+        self.assertEqual(list(process_text_index.word_lengths), list(text_index.word_lengths))
+        self.assertEqual(process_text_index.get_minimum_text_length(), text_index.get_minimum_text_length())
+        self.assertEqual(process_text_index.term_dictionary.elements, text_index.term_dictionary.elements)
+        for element in text_index.get_elements():
+            self.assertEqual(process_text_index.get_postings(element), text_index.get_postings(element))
+        for keywords in [["man", "garden"], ["boy"], ["kitchen"]]:
+            self.assertEqual(TextSearch(process_text_index).find_texts(keywords, k=3),
+                             TextSearch(text_index).find_texts(keywords, k=3))
+
+    def test_texts_are_published_after_their_postings(self):
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('male_person', {'man', 'boy'})
+        text_index = TextIndex(word_sets_manager, WordTokenizer(), index_categories=False)
+        text_index.add('the man is in the garden')
+        partial_text_index = text_index.create_partial_text_index(['the boy is in the garden'])
+        partial_text_index.element_to_postings_map = PausingDict(partial_text_index.element_to_postings_map)
+        male_person = text_index.create_elements_for_words(['boy'])[1]
+
+        merging_thread = threading.Thread(target=text_index.merge, args=(partial_text_index,))
+        merging_thread.start()
+        partial_text_index.element_to_postings_map.paused.wait()
+        number_of_texts = text_index.get_number_of_texts()
+        postings_while_merging = dict(text_index.get_postings(male_person).items())
+        partial_text_index.element_to_postings_map.resumed.set()
+        merging_thread.join()
+
+        self.assertEqual(number_of_texts, 1)
+        self.assertEqual(postings_while_merging, {0: 1})
+        self.assertEqual(dict(text_index.get_postings(male_person).items()), {0: 1, 1: 1})
+
+    def test_delete_and_update_texts(self):
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy', 'garden'})
+        tokenizer = WordTokenizer()
+
+        text_index = TextIndex(word_sets_manager, tokenizer)
+        text_index.add_many(['the man is in the garden', 'the boy gets angry', 'the man is in the kitchen'])
+        text_index.delete(0)
+        new_text_index = text_index.update(1, 'the boy is in the garden')
+
+        self.assertEqual(new_text_index, 3)
+        self.assertEqual(text_index.get_number_of_live_texts(), 2)
+        self.assertEqual(list(text_index.get_text_indices()), [2, 3])
+        self.assertAlmostEqual(text_index.get_average_text_length(), 6)
+        noun = text_index.create_elements_for_words(['boy'])[1]
+        self.assertEqual(dict(text_index.get_postings(noun).items()), {2: 1, 3: 2})
+        with self.assertRaises(ValueError):
+            text_index.delete(0)
+
+        text_index.compact()
+        self.assertEqual(list(text_index.get_text_indices()), [2, 3])
+        self.assertIsNone(text_index.texts[0])
+        self.assertEqual(dict(text_index.get_postings(noun).items()), {2: 1, 3: 2})
+        self.assertEqual(text_index.texts[3], 'the boy is in the garden')
+
+    def test_minimum_text_length_of_live_texts(self):
+        text_index = TextIndex(WordSetManager(), WordTokenizer())
+        text_index.add_many(['the boy gets angry', 'the man is in the garden', 'the boy runs', 'the boy runs'])
+        self.assertEqual(text_index.get_minimum_text_length(), 3)
+
+        text_index.delete(2)
+        self.assertEqual(text_index.get_minimum_text_length(), 3)
+        text_index.delete(3)
+        self.assertEqual(text_index.get_minimum_text_length(), 4)
+        text_index.delete(0)
+        self.assertEqual(text_index.get_minimum_text_length(), 6)
+        text_index.add('the girl runs')
+        self.assertEqual(text_index.get_minimum_text_length(), 3)
+        text_index.compact()
+        self.assertEqual(text_index.get_minimum_text_length(), 3)
+
+    def test_delete_text_after_word_sets_changed(self):
+        word_sets_manager = WordSetManager()
+        word_sets_manager.add('noun', {'man', 'boy'})
+        text_index = TextIndex(word_sets_manager, WordTokenizer())
+        text_index.add('the man is in the garden')
+        word_sets_manager.add('place', {'garden', 'kitchen'})
+        text_index.add_many(['the boy is in the garden', 'the man is in the kitchen'])
+
+        text_index.delete(0)
+        text_index.delete(1)
+        place = text_index.create_elements_for_words(['garden'])[1]
+        self.assertEqual(len(text_index.get_postings(place)), 1)
+        self.assertEqual(dict(text_index.get_postings(place).items()), {2: 1})
+        noun = text_index.create_elements_for_words(['man'])[1]
+        self.assertEqual(len(text_index.get_postings(noun)), 1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,6 +3,7 @@ import os
 from pathlib import Path
 
 from typing import List
+from src.query_profile import QueryProfiler, STAGES
 from src.text_index import TextIndex
 from src.text_search import TextSearch
 from src.word_set_builder import WordSetBuilder
@@ -51,6 +52,152 @@ class TextSearchTestCase(unittest.TestCase):
 
         self.assertTrue(results[0].find("running") > -1)
 
+    def test_find_texts_returns_texts_without_match_at_the_end(self):
+        texts = [
+            'the women is in the kitchen',
+            'the boy is in the garden',
+            'the man is in the garden'
+        ]
+        keywords = ["garden", "man"]
+        text_index = self.__create_text_index(texts, self.__create_word_set_manager())
+
+        text_search = TextSearch(text_index)
+        results = text_search.find_texts(keywords)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], 'the man is in the garden')
+        self.assertEqual(results[1], 'the boy is in the garden')
+        self.assertEqual(results[2], 'the women is in the kitchen')
+
+    def test_find_top_k_texts(self):
+        texts = [
+            'the women is in the kitchen',
+            'the boy is in the garden',
+            'the man is in the garden',
+            'the man is running in the garden'
+        ]
+        keywords = ["garden", "man"]
+        text_index = self.__create_text_index(texts, self.__create_word_set_manager())
+
+        text_search = TextSearch(text_index)
+        all_results = text_search.find_texts(keywords)
+        results = text_search.find_texts(keywords, k=2)
+
+        self.assertEqual(results, all_results[:2])
+        self.assertEqual(len(text_search.find_texts(keywords, k=10)), 3)
+
+    def test_find_texts_batch(self):
+        texts = [
+            'the women is in the kitchen',
+            'the boy is in the garden',
+            'the man is in the garden',
+            'the grandfather went to the garden'
+        ]
+        keywords_list = [["garden", "man"], ["grandfather", "in"], ["kitchen"], ["man", "man"], []]
+        text_index = self.__create_text_index(texts, self.__create_word_set_manager())
+
+        text_search = TextSearch(text_index)
+        results = text_search.find_texts_batch(keywords_list)
+        top_k_results = text_search.find_texts_batch(keywords_list, k=2)
+
+        self.assertEqual(results, [text_search.find_texts(keywords) for keywords in keywords_list])
+        self.assertEqual(top_k_results, [text_search.find_texts(keywords, k=2) for keywords in keywords_list])
+
+    def test_caches_are_invalidated_by_changes(self):
+        texts = [
+            'the women is in the kitchen',
+            'the man is in the garden'
+        ]
+        word_set_manager = self.__create_word_set_manager()
+        text_index = self.__create_text_index(texts, word_set_manager)
+
+        text_search = TextSearch(text_index, result_cache_size=8)
+        self.assertEqual(text_search.find_texts(["grandfather"], k=1), ['the man is in the garden'])
+        self.assertEqual(text_search.find_texts(["grandfather"], k=1), ['the man is in the garden'])
+        self.assertEqual(text_search.get_cache_statistics()['results']['hits'], 1)
+
+        text_index.add('the grandfather is in the garden')
+        self.assertEqual(text_search.find_texts(["grandfather"], k=1), ['the grandfather is in the garden'])
+        word_set_manager.add('female_person', {'women', 'grandfather'})
+        self.assertEqual(text_search.find_texts(["grandfather"]), TextSearch(text_index).find_texts(["grandfather"]))
+        self.assertEqual(text_search.get_cache_statistics()['results']['hits'], 1)
+
+    def test_profiler_receives_timings_and_counters(self):
+        texts = [
+            'the women is in the kitchen',
+            'the man is in the garden'
+        ]
+        text_index = self.__create_text_index(texts, self.__create_word_set_manager())
+        profiles = []
+
+        text_search = TextSearch(text_index, profiler=QueryProfiler(profiles.append))
+        text_search.find_texts(["man", "kitchen"], k=1)
+
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(set(profiles[0].stage_seconds.keys()), set(STAGES))
+        self.assertEqual(profiles[0].number_of_elements, 3)
+        self.assertEqual(profiles[0].number_of_category_elements, 1)
+        self.assertEqual(profiles[0].number_of_texts_scored, 2)
+        self.assertEqual(profiles[0].number_of_results, 1)
+        self.assertEqual(text_search.profiler.get_statistics()['number_of_queries'], 1)
+        index_statistics = text_index.get_index_statistics()
+        self.assertEqual(index_statistics.number_of_live_texts, 2)
+        self.assertEqual(index_statistics.max_category_fan_out, 1)
+
+    def test_failing_profiler_hook_does_not_fail_query(self):
+        text_index = self.__create_text_index(['the man is in the garden'], self.__create_word_set_manager())
+        profiles = []
+        profiler = QueryProfiler(lambda profile: 1 / 0)
+        profiler.add_hook(profiles.append)
+
+        with self.assertLogs('src.query_profile', level='ERROR'):
+            texts_list = TextSearch(text_index, profiler=profiler).find_texts_batch([["man"], ["man", "garden"]], k=1)
+
+        self.assertEqual(texts_list, [['the man is in the garden'], ['the man is in the garden']])
+        self.assertEqual(len(profiles), 2)
+        single_profiles = []
+        TextSearch(text_index, profiler=QueryProfiler(single_profiles.append)).find_texts(["man"], k=1)
+        # the postings of the elements shared by both queries are scanned for the first one
+        self.assertTrue(profiles[0].number_of_postings_scanned > single_profiles[0].number_of_postings_scanned)
+
+    def test_find_pages_and_iterate_texts(self):
+        texts = [
+            'the women is in the kitchen',
+            'the boy is in the garden',
+            'the man is in the garden',
+            'the grandfather went to the garden'
+        ]
+        keywords = ["garden", "man"]
+        text_index = self.__create_text_index(texts, self.__create_word_set_manager())
+
+        text_search = TextSearch(text_index)
+        first_page = text_search.find_page(keywords, page_size=2)
+        second_page = text_search.find_page(keywords, page_size=2, cursor=first_page.next_cursor)
+
+        self.assertIsNone(second_page.next_cursor)
+        text_indices = [result.text_index for result in first_page.results + second_page.results]
+        self.assertEqual(text_search.get_texts(text_indices), text_search.find_texts(keywords, k=3))
+        self.assertEqual([text for _, text in text_search.iterate_texts(keywords)],
+                         text_search.find_texts(keywords, k=3))
+        self.assertRaises(ValueError, text_search.find_page, keywords, 2, 'invalid')
+
+    def test_find_page_rejects_cursor_of_changed_index(self):
+        texts = [
+            'the boy is in the garden',
+            'the man is in the garden',
+            'the grandfather went to the garden'
+        ]
+        text_index = self.__create_text_index(texts, self.__create_word_set_manager())
+
+        text_search = TextSearch(text_index)
+        first_page = text_search.find_page(["garden"], page_size=1)
+        text_index.add('the women is in the garden')
+
+        self.assertRaises(ValueError, text_search.find_page, ["garden"], 1, first_page.next_cursor)
+        first_page = text_search.find_page(["garden"], page_size=1)
+        second_page = text_search.find_page(["garden"], page_size=1, cursor=first_page.next_cursor)
+        self.assertNotEqual(first_page.results[0].text_index, second_page.results[0].text_index)
+
     def __create_text_index(self, texts: List[str], word_set_manager: WordSetManager) -> TextIndex:
         tokenizer = WordTokenizer()
         text_index = TextIndex(word_set_manager, tokenizer)
@@ -1,8 +1,14 @@
 from typing import Set, List
+import json
 import os
+import tempfile
 import unittest
 from pathlib import Path
+import numpy as np
+from src.embedding_store import EmbeddingStore, VECTORS_FILE_NAME, WORDS_FILE_NAME
+from src.jsonl_reader import read_jsonl_texts
 from src.word_set_builder import WordSetBuilder
+from src.word_set_manager import WordSetManager
 from src.word_tokenizer import WordTokenizer
 
 
@@ -14,6 +20,63 @@ class WordSetBuilderTestCase(unittest.TestCase):
         word_sets = word_set_builder.create_sets_from_sts_file(file_name)
         self.assertTrue(self.__contains_set(word_sets, {"moving", "running"}))
 
+    def test_create_word_sets_with_single_algorithm(self):
+        file_name = os.path.join(Path(__file__).parent, 'data', 'train.jsonl')
+        tokenizer = WordTokenizer()
+        for clustering_algorithm in ['hdbscan', 'optics']:
+            word_set_builder = WordSetBuilder(tokenizer, clustering_algorithm=clustering_algorithm)
+            word_sets = word_set_builder.create_sets_from_sts_file(file_name, number_of_lines=20)
+            self.assertTrue(len(word_sets) > 0)
+            self.assertTrue(all(len(word_set) > 0 for word_set in word_sets))
+
+    def test_count_words(self):
+        file_name = os.path.join(Path(__file__).parent, 'data', 'train.jsonl')
+        texts = list(read_jsonl_texts(file_name, number_of_lines=50))
+        word_set_builder = WordSetBuilder(WordTokenizer())
+
+        word_counter = word_set_builder.count_words(texts, batch_size=7)
+
+        self.assertEqual(word_counter['plane'], 2)
+        self.assertFalse('.' in word_counter)
+        self.assertEqual(word_set_builder.count_words(texts, batch_size=7, n_process=2), word_counter)
+
+    def test_unknown_clustering_algorithm(self):
+        with self.assertRaises(ValueError):
+            WordSetBuilder(WordTokenizer(), clustering_algorithm='kmeans')
+
+    def test_add_words_to_existing_sets(self):
+        word_to_vector_map = {
+            'man': [1, 0, 0], 'boy': [0.9, 0.1, 0], 'grandfather': [0.95, 0, 0.05],
+            'garden': [0, 1, 0], 'kitchen': [0.1, 0.9, 0],
+            'girl': [0.9, 0, 0.1], 'house': [0, 0.95, 0.1],
+            'run': [0, 0, 1], 'went': [0.05, 0, 1], 'go': [0, 0.05, 1],
+            'lad': [1, 0.02, 0], 'lonely': [0.5, 0.5, 0.5]
+        }
+        word_set_manager = WordSetManager()
+        word_set_manager.add('male_person', {'man', 'boy', 'grandfather'})
+        word_set_manager.add('room', {'garden', 'kitchen'})
+        word_set_manager.add('empty', set())
+        with tempfile.TemporaryDirectory() as directory:
+            np.save(os.path.join(directory, VECTORS_FILE_NAME),
+                    np.array(list(word_to_vector_map.values()), dtype=np.float32))
+            with open(os.path.join(directory, WORDS_FILE_NAME), mode='w', encoding='utf-8') as f:
+                json.dump(list(word_to_vector_map.keys()), f)
+            word_set_builder = WordSetBuilder(embedding_store=EmbeddingStore(directory))
+
+            added = word_set_builder.add_words_to_sets(word_set_manager, ['girl', 'house', 'man', 'run', 'went', 'go'],
+                                                       distance_threshold=0.1)
+            with self.assertLogs('src.word_set_builder', level='INFO') as logs:
+                added_later = word_set_builder.add_words_to_sets(word_set_manager, ['lad', 'lonely'],
+                                                                 distance_threshold=0.1)
+
+        self.assertEqual(added['male_person'], {'girl'})
+        self.assertEqual(added['room'], {'house'})
+        self.assertEqual(word_set_manager.category_to_sets_map['room'].get_elements(), {'garden', 'kitchen', 'house'})
+        new_labels = [label for label in added.keys() if label not in ['male_person', 'room']]
+        self.assertEqual([added[label] for label in new_labels], [{'run', 'went', 'go'}])
+        self.assertEqual(added_later, {'male_person': {'lad'}})
+        self.assertIn('lonely', logs.output[0])
+
     def __contains_set(self, word_sets: List[Set[str]], required_word_set: Set[str]) -> bool:
         for word_set in word_sets:
             set_found = True
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 from src.word_set_manager import WordSetManager
@@ -11,6 +13,30 @@ class WordSetManagerTestCase(unittest.TestCase):
         word_sets = word_set_manager.get_word_sets_for_element('man')
         self.assertEqual(len(word_sets), 1)
 
+    def test_add_words_to_existing_word_set(self):
+        word_set_manager = WordSetManager()
+        word_set_manager.add('noun', {'man', 'boy'})
+        word_set_manager.add('noun', {'garden'})
+
+        self.assertEqual(word_set_manager.category_to_sets_map['noun'].elements, {'man', 'boy', 'garden'})
+        self.assertEqual(word_set_manager.get_word_sets_for_element('man'),
+                         word_set_manager.get_word_sets_for_element('garden'))
+        self.assertEqual(word_set_manager.version, 2)
+
+    def test_save_and_load_word_set_manager(self):
+        word_set_manager = WordSetManager()
+        word_set_manager.add('noun', {'man', 'boy', 'garden'})
+        word_set_manager.add('verb', {'go', 'went', 'is'})
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'word_sets.json')
+            word_set_manager.save(file_name)
+            loaded_word_set_manager = WordSetManager.load(file_name)
+
+        word_sets = loaded_word_set_manager.get_word_sets_for_element('man')
+        self.assertEqual([word_set.get_label() for word_set in word_sets], ['noun'])
+        self.assertEqual(loaded_word_set_manager.category_to_sets_map['verb'].elements, {'go', 'went', 'is'})
+
 
 if __name__ == '__main__':
     unittest.main()
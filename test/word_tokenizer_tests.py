@@ -0,0 +1,51 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from src.word_tokenizer import WordTokenizer, get_component_names, DEFAULT_MODEL_NAME
+
+
+class WordTokenizerTestCase(unittest.TestCase):
+    def test_component_names_are_read_from_meta(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'meta.json'), mode='w', encoding='utf-8') as f:
+                json.dump({'lang': 'en', 'name': 'test', 'version': '1.0.0', 'pipeline': ['transformer', 'textcat'],
+                           'components': ['transformer', 'textcat', 'entity_ruler']}, f)
+
+            self.assertEqual(get_component_names(directory), ['transformer', 'textcat', 'entity_ruler'])
+        self.assertIsInstance(get_component_names(DEFAULT_MODEL_NAME), list)
+
+    def test_model_loaded_on_first_use(self):
+        tokenizer = WordTokenizer()
+        self.assertFalse(tokenizer.is_loaded())
+
+        tokens = tokenizer.tokenize('the man is in the garden')
+
+        self.assertTrue(tokenizer.is_loaded())
+        self.assertEqual(len(tokens), 6)
+
+    def test_tokenize_without_vectors(self):
+        text = "the man's garden, the boy's kitchen."
+        tokenizer = WordTokenizer(use_vectors=False)
+
+        tokens = tokenizer.tokenize(text)
+
+        self.assertEqual([token.text for token in tokens], [token.text for token in WordTokenizer().tokenize(text)])
+        self.assertFalse(any(token.has_vector for token in tokens))
+
+    def test_shared_and_pickled_tokenizer(self):
+        tokenizer = WordTokenizer.get_shared(use_vectors=False)
+        self.assertIs(WordTokenizer.get_shared(use_vectors=False), tokenizer)
+
+        tokenizer.tokenize('the man')
+        copy = pickle.loads(pickle.dumps(tokenizer))
+
+        self.assertFalse(copy.is_loaded())
+        self.assertFalse(copy.use_vectors)
+        self.assertEqual(len(copy.tokenize('the man')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()